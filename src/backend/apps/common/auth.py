@@ -1,66 +1,90 @@
-from datetime import datetime, timedelta, timezone
+import time
+from functools import lru_cache
 from typing import Optional, Any
-from jose import jwt, JWTError
+import jwt
 from ninja.security import HttpBearer
+from django.db.models import QuerySet
 from django.http import HttpRequest
+from apps.users.models import User
 from saghat.settings.base import settings
 
 
 def create_access_token(user_id: int) -> str:
     """Create a signed JWT access token for the given user ID."""
-    expire = datetime.now(timezone.utc) + timedelta(
-        minutes=settings.JWT_EXPIRE_MINUTES
-    )
+    expire = int(time.time()) + settings.JWT_EXPIRE_MINUTES * 60
     payload = {"sub": str(user_id), "exp": expire}
     return jwt.encode(
         payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
 
 
-def decode_access_token(token: str) -> Optional[int]:
-    """Decode a JWT access token and return the user ID, or None if invalid."""
+@lru_cache(maxsize=4096)
+def _decode(token: str) -> tuple[Optional[int], float]:
+    """
+    Verify a token once and return (user_id, exp as epoch seconds).
+
+    The result only depends on the token string, so it is memoized; callers
+    must still compare exp to the current time.
+    """
     try:
         payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+            token,
+            settings.JWT_SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            options={"require": ["exp", "sub"]},
         )
-        user_id = payload.get("sub")
-        return int(user_id) if user_id else None
-    except JWTError:
+        return int(payload["sub"]), float(payload["exp"])
+    except (jwt.PyJWTError, ValueError):
+        return None, 0.0
+
+
+def decode_access_token(token: str) -> Optional[int]:
+    """Decode a JWT access token and return the user ID, or None if invalid."""
+    user_id, exp = _decode(token)
+    if user_id is None or exp < time.time():
         return None
+    return user_id
 
 
 class JWTAuth(HttpBearer):
     """Bearer auth that authenticates any active user."""
 
-    def authenticate(self, request: HttpRequest, token: str) -> Optional[Any]:
-        from apps.users.models import User
+    def get_queryset(self) -> QuerySet:
+        """
+        Users this auth accepts; subclasses may narrow or annotate it.
+
+        Only the columns the API reads are loaded, leaving out password,
+        last_login, date_joined and the other AbstractUser bookkeeping fields.
+        """
+        return User.objects.filter(is_active=True).only(
+            "id",
+            "username",
+            "first_name",
+            "last_name",
+            "email",
+            "is_active",
+            "is_main",
+            "balance",
+            "loan_request_amount",
+        )
 
+    def authenticate(self, request: HttpRequest, token: str) -> Optional[Any]:
         user_id = decode_access_token(token)
         if user_id is None:
             return None
         try:
-            user = User.objects.get(pk=user_id, is_active=True)
+            user = self.get_queryset().get(pk=user_id)
             request.user = user
             return user
         except User.DoesNotExist:
             return None
 
 
-class MainUserAuth(HttpBearer):
+class MainUserAuth(JWTAuth):
     """Auth that only allows is_main users."""
 
-    def authenticate(self, request: HttpRequest, token: str) -> Optional[Any]:
-        from apps.users.models import User
-
-        user_id = decode_access_token(token)
-        if user_id is None:
-            return None
-        try:
-            user = User.objects.get(pk=user_id, is_active=True, is_main=True)
-            request.user = user
-            return user
-        except User.DoesNotExist:
-            return None
+    def get_queryset(self) -> QuerySet:
+        return super().get_queryset().filter(is_main=True)
 
 
 jwt_auth = JWTAuth()
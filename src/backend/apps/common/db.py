@@ -0,0 +1,12 @@
+from django.db import IntegrityError
+
+
+def violated_constraint(exc: IntegrityError) -> str | None:
+    """
+    Return the name of the constraint behind an IntegrityError.
+
+    Django wraps the psycopg error, which carries the name in its diag
+    attribute; None when the driver did not report one.
+    """
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None)
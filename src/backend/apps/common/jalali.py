@@ -1,5 +1,6 @@
 import jdatetime
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 from typing import NamedTuple
 
 
@@ -8,13 +9,19 @@ class JalaliDate(NamedTuple):
     month: int
 
 
+@lru_cache(maxsize=4096)
+def _jalali_from_ymd(year: int, month: int, day: int) -> JalaliDate:
+    """Jalali year/month of a Gregorian date; memoized, as it never changes."""
+    jd = jdatetime.date.fromgregorian(year=year, month=month, day=day)
+    return JalaliDate(year=jd.year, month=jd.month)
+
+
 def get_current_jalali() -> JalaliDate:
     """Return current Jalali year and month."""
-    now = jdatetime.datetime.now()
-    return JalaliDate(year=now.year, month=now.month)
+    today = date.today()
+    return _jalali_from_ymd(today.year, today.month, today.day)
 
 
 def gregorian_to_jalali(dt: datetime) -> JalaliDate:
     """Convert a Gregorian datetime to Jalali year/month."""
-    jdt = jdatetime.datetime.fromgregorian(datetime=dt)
-    return JalaliDate(year=jdt.year, month=jdt.month)
+    return _jalali_from_ymd(dt.year, dt.month, dt.day)
@@ -0,0 +1,29 @@
+from typing import Any
+
+import orjson
+from django.http import HttpRequest
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Render API responses with orjson instead of the stdlib json module.
+
+    orjson encodes dicts, lists, strings, ints and UUIDs in C. Anything it does
+    not handle natively (Decimal amounts, and datetimes via
+    OPT_PASSTHROUGH_DATETIME) falls back to ninja's own encoder, so the wire
+    format is unchanged: Decimals are still rendered as JSON strings.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self) -> None:
+        self._default = NinjaJSONEncoder().default
+
+    def render(
+        self, request: HttpRequest, data: Any, *, response_status: int
+    ) -> bytes:
+        return orjson.dumps(data, default=self._default, option=_ORJSON_OPTIONS)
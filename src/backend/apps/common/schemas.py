@@ -0,0 +1,38 @@
+from typing import Optional, Self
+
+from django.db.models import Q, QuerySet
+from pydantic import BaseModel, Field, model_validator
+
+
+class JalaliMonthPage(BaseModel):
+    """
+    Keyset pagination over (jalali_year, jalali_month), newest first.
+
+    To fetch the next page pass the jalali_year/jalali_month of the last row
+    received as before_year/before_month. before_month narrows before_year,
+    so it is rejected on its own.
+    """
+
+    before_year: Optional[int] = None
+    before_month: Optional[int] = Field(default=None, ge=1, le=12)
+    limit: Optional[int] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def month_needs_year(self) -> Self:
+        if self.before_month is not None and self.before_year is None:
+            raise ValueError("before_month requires before_year")
+        return self
+
+    def paginate(self, qs: QuerySet) -> QuerySet:
+        """Rows of an ordered queryset before the cursor, at most limit of them."""
+        if self.before_year is not None:
+            before = Q(jalali_year__lt=self.before_year)
+            if self.before_month is not None:
+                before |= Q(
+                    jalali_year=self.before_year,
+                    jalali_month__lt=self.before_month,
+                )
+            qs = qs.filter(before)
+        if self.limit is not None:
+            qs = qs[: self.limit]
+        return qs
@@ -29,6 +29,8 @@ class LoanAdmin(admin.ModelAdmin):
         "id",
         "created_at",
     )
+    # Loan.user is nullable, which Django's automatic select_related() skips.
+    list_select_related = ("user",)
     ordering = ("-created_at",)
 
     def has_add_permission(self, request):
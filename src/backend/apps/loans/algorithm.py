@@ -1,24 +1,30 @@
 import math
 import random
+import secrets
 from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Optional
+from typing import TYPE_CHECKING, NotRequired, Optional, TypedDict
 
-from django.db.models import Sum
+from django.db.models import Count, Exists, OuterRef, Sum
 
+if TYPE_CHECKING:
+    from apps.loans.models import Loan
+    from apps.users.models import User
 
-@dataclass
-class NotParticipatedEntry:
+
+class NotParticipatedEntry(TypedDict):
     user_id: int
     username: str
     reason: str
 
 
-@dataclass
-class ParticipatedEntry:
+class ParticipatedEntry(TypedDict):
     user_id: int
     username: str
     point: str  # "unlimited", "0", or decimal string
+    # True when a fundable user is unlimited, so this finite score was out of
+    # the draw; point still holds the score for the audit trail
+    skipped: NotRequired[bool]
 
 
 @dataclass
@@ -29,6 +35,21 @@ class AssignmentLog:
     random_pool: list[int] = field(
         default_factory=list
     )  # user_ids in random pool
+    seed: Optional[int] = None  # seed of the winner draw, to replay it
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the log into the JSON shape stored on Loan.log.
+
+        Entries are already plain dicts (TypedDicts), so no per-entry copy is made.
+        """
+        return {
+            "not_participated": self.not_participated,
+            "participated": self.participated,
+            "selected": self.selected,
+            "random_pool": self.random_pool,
+            "seed": self.seed,
+        }
 
 
 @dataclass
@@ -39,7 +60,90 @@ class UserScore:
     loan_request_amount: Decimal
 
 
-def compute_user_score(user: "User") -> Optional[Decimal]:  # type: ignore[name-defined]
+@dataclass
+class ScoreInputs:
+    """Per-user aggregates consumed by compute_user_score()."""
+
+    last_payment_amount: Optional[Decimal] = None
+    total_payments_count: int = 0
+    total_loan_payments: int = 0
+    months_with_loan_payment: int = 0
+    total_loan_amount: Decimal = Decimal("0")
+    total_loan_count: int = 0
+    previous_loan_amount: Optional[Decimal] = None
+
+
+def collect_score_inputs(user_ids: list[int]) -> dict[int, ScoreInputs]:
+    """
+    Fetch the score inputs for all given users in a fixed number of queries.
+
+    Returns a dict keyed by user_id; users without any history get a default
+    ScoreInputs (which compute_user_score() treats as unlimited).
+    """
+    from apps.loans.models import Loan, LoanState
+    from apps.payments.models import Payment
+
+    inputs = {user_id: ScoreInputs() for user_id in user_ids}
+    if not inputs:
+        return inputs
+
+    payments = Payment.objects.filter(user_id__in=user_ids)
+
+    # Payments per user and how many of them carry a loan repayment, in one
+    # GROUP BY. LoanPayment is 1:1 with Payment and Payment is unique per
+    # (user, jalali_year, jalali_month), so the latter is both the loan payment
+    # count and the number of distinct months with a loan payment.
+    for row in payments.values("user_id").annotate(
+        total=Count("id"), with_loan=Count("loan_payment")
+    ):
+        entry = inputs[row["user_id"]]
+        entry.total_payments_count = row["total"]
+        entry.total_loan_payments = row["with_loan"]
+        entry.months_with_loan_payment = row["with_loan"]
+
+    # Amount of each user's most recent payment (DISTINCT ON user_id)
+    last_payments = (
+        payments.order_by("user_id", "-jalali_year", "-jalali_month")
+        .distinct("user_id")
+        .values_list("user_id", "amount")
+    )
+    for user_id, amount in last_payments:
+        inputs[user_id].last_payment_amount = amount
+
+    active_loans = Loan.objects.filter(
+        user_id__in=user_ids, state=LoanState.ACTIVE
+    )
+
+    # Total amount and number of active loans per user
+    for row in active_loans.values("user_id").annotate(
+        total=Sum("amount"), cnt=Count("id")
+    ):
+        entry = inputs[row["user_id"]]
+        entry.total_loan_amount = row["total"] or Decimal("0")
+        entry.total_loan_count = row["cnt"]
+
+    # Amount of each user's most recent active loan (DISTINCT ON user_id)
+    previous_loans = (
+        active_loans.order_by("user_id", "-created_at")
+        .distinct("user_id")
+        .values_list("user_id", "amount")
+    )
+    for user_id, amount in previous_loans:
+        inputs[user_id].previous_loan_amount = amount
+
+    return inputs
+
+
+def _safe_log(value: Decimal | int) -> float:
+    """log(value) clamped to 0: non-positive values and log() <= 0 give 0.0."""
+    value = float(value)
+    return max(math.log(value), 0.0) if value > 0 else 0.0
+
+
+def compute_user_score(
+    user: "User",
+    inputs: Optional[ScoreInputs] = None,
+) -> Optional[Decimal]:
     """
     Compute the loan assignment score for a user.
 
@@ -62,118 +166,89 @@ def compute_user_score(user: "User") -> Optional[Decimal]:  # type: ignore[name-
     For log() factors: if the value is 0 or negative, treat as 0 (skip that factor).
     For count factors: if 0, that factor contributes 0 to denominator (making it 0 → unlimited).
 
+    inputs: Precomputed aggregates from collect_score_inputs(). When omitted they
+            are fetched for this single user.
+
     IMPORTANT: Check denominator first. If any denominator factor is 0, return None immediately.
     """
-    from apps.loans.models import Loan, LoanState
-    from apps.payments.models import LoanPayment, Payment
+    if inputs is None:
+        inputs = collect_score_inputs([user.id])[user.id]
 
-    # --- Denominator factors ---
-
-    # total_payment_for_last_month: sum of amounts in the user's most recent Payment
-    last_payment = (
-        Payment.objects.filter(user=user)
-        .order_by("-jalali_year", "-jalali_month")
-        .first()
-    )
-    if last_payment is None:
-        return None  # No payment history → unlimited
-    total_payment_for_last_month = last_payment.amount
-    if total_payment_for_last_month <= 0:
-        return None  # denominator would be 0
-
-    # total_user_loan_payments: count of all LoanPayment records for this user
-    total_user_loan_payments = LoanPayment.objects.filter(
-        payment__user=user
-    ).count()
-    if total_user_loan_payments == 0:
-        return None  # denominator would be 0
-
-    # total_loan_amount_user_get: sum of all loan amounts received
-    total_loan_amount = Loan.objects.filter(
-        user=user, state=LoanState.ACTIVE
-    ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-    if total_loan_amount <= 0:
-        return None  # log(0) → denominator would be 0
-    log_total_loan_amount = Decimal(str(math.log(float(total_loan_amount))))
-    if log_total_loan_amount <= 0:
+    denominator = score_denominator(user, inputs)
+    if denominator is None:
         return None
+    return _finite_score(user, inputs, denominator)
 
-    # total_loan_user_get: count of loans received (active or settled)
-    total_loan_user_get = Loan.objects.filter(
-        user=user, state=LoanState.ACTIVE
-    ).count()
-    if total_loan_user_get == 0:
-        return None  # denominator would be 0
-
-    # log(loan_request_amount)
-    if user.loan_request_amount <= 0:
-        return None  # log(0) → denominator would be 0
-    log_loan_request = Decimal(str(math.log(float(user.loan_request_amount))))
-    if log_loan_request <= 0:
-        return None
+
+def score_denominator(
+    user: "User",
+    inputs: ScoreInputs,
+) -> Optional[float]:
+    """
+    Return the denominator product of the user's score, or None if it is 0.
+
+    None means the score is unlimited; this is cheaper than compute_user_score()
+    because the numerator factors are never evaluated.
+    """
+    # All intermediate math is done in float: the log factors are approximations
+    # anyway, so Decimal precision buys nothing. Only the result is a Decimal.
+    # Counts and clamped logs (see _safe_log) are never negative, so the product
+    # is positive exactly when every factor is, and one check replaces five.
+    if inputs.last_payment_amount is None:
+        return None  # No payment history → unlimited
 
     denominator = (
-        total_payment_for_last_month
-        * Decimal(str(total_user_loan_payments))
-        * log_total_loan_amount
-        * Decimal(str(total_loan_user_get))
-        * log_loan_request
+        # total_payment_for_last_month: amount of the user's most recent Payment
+        float(inputs.last_payment_amount)
+        # total_user_loan_payments: count of all LoanPayment records for this user
+        * inputs.total_loan_payments
+        # log(total_loan_amount_user_get): log of all loan amounts received
+        * _safe_log(inputs.total_loan_amount)
+        # total_loan_user_get: count of loans received (active or settled)
+        * inputs.total_loan_count
+        # log(loan_request_amount)
+        * _safe_log(user.loan_request_amount)
     )
 
     if denominator <= 0:
         return None  # unlimited
 
+    return denominator
+
+
+def _finite_score(
+    user: "User",
+    inputs: ScoreInputs,
+    denominator: float,
+) -> Decimal:
+    """Divide the user's numerator product by an already computed denominator."""
     # --- Numerator factors ---
 
     # log(previous_loan_amount): most recent loan amount
-    previous_loan = (
-        Loan.objects.filter(user=user, state=LoanState.ACTIVE)
-        .order_by("-created_at")
-        .first()
-    )
-    if (
-        previous_loan is None
-        or previous_loan.amount is None
-        or previous_loan.amount <= 0
-    ):
-        log_previous_loan = Decimal("0")
-    else:
-        log_val = math.log(float(previous_loan.amount))
-        log_previous_loan = (
-            Decimal(str(log_val)) if log_val > 0 else Decimal("0")
-        )
+    log_previous_loan = _safe_log(inputs.previous_loan_amount or 0)
 
     # log(balance)
-    if user.balance <= 0:
-        log_balance = Decimal("0")
-    else:
-        log_val = math.log(float(user.balance))
-        log_balance = Decimal(str(log_val)) if log_val > 0 else Decimal("0")
+    log_balance = _safe_log(user.balance)
 
     # total_month_no_loan: count of months where user paid but had no active loan
     # Approximated as: total payments - months where they had an active loan payment
-    total_payments_count = Payment.objects.filter(user=user).count()
-    months_with_loan_payment = (
-        LoanPayment.objects.filter(payment__user=user)
-        .values("payment__jalali_year", "payment__jalali_month")
-        .distinct()
-        .count()
-    )
     total_month_no_loan = max(
-        0, total_payments_count - months_with_loan_payment
+        0, inputs.total_payments_count - inputs.months_with_loan_payment
     )
 
-    numerator = (
-        log_previous_loan * log_balance * Decimal(str(total_month_no_loan))
-    )
+    numerator = log_previous_loan * log_balance * total_month_no_loan
 
     if numerator <= 0:
         return Decimal("0")
 
-    return numerator / denominator
+    return Decimal(repr(numerator / denominator))
 
 
-def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type: ignore[name-defined]
+def run_loan_assignment(
+    jalali_year: int,
+    jalali_month: int,
+    seed: Optional[int] = None,
+) -> "Loan":
     """
     Run the loan assignment algorithm for the given Jalali month.
 
@@ -185,6 +260,10 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
     5. Check fund balance
     6. Create/update Loan record
 
+    seed: Seed for the winner draw. None draws a fresh random seed. Either way
+          the seed is recorded in loan.log["seed"], and passing it back
+          replays the same selection (e.g. for audits and tests).
+
     Returns the created/updated Loan object.
     """
     from django.db import transaction
@@ -195,8 +274,19 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
 
     config = Config.get_config()
 
-    # Get all active users
-    all_users = list(User.objects.filter(is_active=True))
+    # Get all active users, loading only the columns the algorithm reads and
+    # whether each one has an active loan (instead of a query per user)
+    all_users = list(
+        User.objects.filter(is_active=True)
+        .only("id", "username", "is_main", "loan_request_amount", "balance")
+        .annotate(
+            has_active_loan_db=Exists(
+                Loan.objects.filter(
+                    user=OuterRef("pk"), state=LoanState.ACTIVE
+                )
+            )
+        )
+    )
 
     # Check all users have paid this month
     paid_user_ids = set(
@@ -214,10 +304,8 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
             f"Unpaid: {unpaid_names}"
         )
 
-    # Calculate saghat_balance (sum of all user balances)
-    saghat_balance = User.objects.filter(is_active=True).aggregate(
-        total=Sum("balance")
-    )["total"] or Decimal("0")
+    # Calculate saghat_balance (sum of all active user balances)
+    saghat_balance = sum((u.balance for u in all_users), Decimal("0"))
 
     log = AssignmentLog()
 
@@ -236,7 +324,7 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
             continue
 
         # Condition 2: no active loan
-        if user.has_active_loan:
+        if user.has_active_loan_db:
             log.not_participated.append(
                 NotParticipatedEntry(
                     user_id=user.id,
@@ -266,34 +354,41 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
                 state=LoanState.NO_ONE,
                 jalali_year=jalali_year,
                 jalali_month=jalali_month,
-                log={
-                    "not_participated": [
-                        {
-                            "user_id": e.user_id,
-                            "username": e.username,
-                            "reason": e.reason,
-                        }
-                        for e in log.not_participated
-                    ],
-                    "participated": [],
-                    "selected": None,
-                    "random_pool": [],
-                },
+                log=log.to_dict(),
             )
         return loan
 
     # Compute scores for eligible users
+    users_by_id = {u.id: u for u in eligible_users}
+    score_inputs = collect_score_inputs([u.id for u in eligible_users])
+    denominators = {
+        u.id: score_denominator(u, score_inputs[u.id]) for u in eligible_users
+    }
+    # An unlimited score beats any finite one, so once a fundable user is
+    # unlimited the finite scores cannot change the outcome: they are logged
+    # (marked skipped) but kept out of the draw.
+    skip_finite = any(
+        denominators[u.id] is None and u.loan_request_amount <= saghat_balance
+        for u in eligible_users
+    )
     user_scores: list[UserScore] = []
     for user in eligible_users:
-        score = compute_user_score(user)
-        score_str = "unlimited" if score is None else str(score)
-        log.participated.append(
-            ParticipatedEntry(
-                user_id=user.id,
-                username=user.username,
-                point=score_str,
-            )
+        denominator = denominators[user.id]
+        if denominator is None:
+            score = None
+            score_str = "unlimited"
+        else:
+            score = _finite_score(user, score_inputs[user.id], denominator)
+            score_str = str(score)
+        entry = ParticipatedEntry(
+            user_id=user.id,
+            username=user.username,
+            point=score_str,
         )
+        log.participated.append(entry)
+        if score is not None and skip_finite:
+            entry["skipped"] = True
+            continue
         user_scores.append(
             UserScore(
                 user_id=user.id,
@@ -316,50 +411,38 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
                 jalali_year=jalali_year,
                 jalali_month=jalali_month,
                 log={
-                    "not_participated": [
-                        {
-                            "user_id": e.user_id,
-                            "username": e.username,
-                            "reason": e.reason,
-                        }
-                        for e in log.not_participated
-                    ],
-                    "participated": [
-                        {
-                            "user_id": e.user_id,
-                            "username": e.username,
-                            "point": e.point,
-                        }
-                        for e in log.participated
-                    ],
-                    "selected": None,
-                    "random_pool": [],
+                    **log.to_dict(),
                     "note": "No user's loan_request_amount fits within saghat_balance",
                 },
             )
         return loan
 
-    # Determine max score group
-    # None (unlimited) > any Decimal
-    has_unlimited = any(us.score is None for us in fundable_scores)
-
-    if has_unlimited:
-        max_score_group = [us for us in fundable_scores if us.score is None]
-    else:
-        max_score = max(us.score for us in fundable_scores)  # type: ignore[type-var]
-        max_score_group = [
-            us for us in fundable_scores if us.score == max_score
-        ]
+    # Determine max score group in a single pass
+    # None (unlimited) > any Decimal: rank by (is_unlimited, score)
+    max_key: Optional[tuple[bool, Decimal]] = None
+    max_score_group: list[UserScore] = []
+    for us in fundable_scores:
+        key = (
+            (True, Decimal("0")) if us.score is None else (False, us.score)
+        )
+        if max_key is None or key > max_key:
+            max_key = key
+            max_score_group = [us]
+        elif key == max_key:
+            max_score_group.append(us)
 
     # Random selection from max score group
     log.random_pool = [us.user_id for us in max_score_group]
-    winner_score = random.choice(max_score_group)
+    if seed is None:
+        # 53 bits stay exact as a JSON number in JavaScript clients too
+        seed = secrets.randbits(53)
+    log.seed = seed
+    rng = random.Random(seed)
+    winner_score = max_score_group[rng.randrange(len(max_score_group))]
     log.selected = winner_score.user_id
 
     # Get the winner User object
-    winner_user = next(
-        u for u in eligible_users if u.id == winner_score.user_id
-    )
+    winner_user = users_by_id[winner_score.user_id]
 
     # Create the active loan
     with transaction.atomic():
@@ -370,26 +453,7 @@ def run_loan_assignment(jalali_year: int, jalali_month: int) -> "Loan":  # type:
             jalali_year=jalali_year,
             jalali_month=jalali_month,
             min_amount_for_each_payment=config.min_amount_for_loan_payment,
-            log={
-                "not_participated": [
-                    {
-                        "user_id": e.user_id,
-                        "username": e.username,
-                        "reason": e.reason,
-                    }
-                    for e in log.not_participated
-                ],
-                "participated": [
-                    {
-                        "user_id": e.user_id,
-                        "username": e.username,
-                        "point": e.point,
-                    }
-                    for e in log.participated
-                ],
-                "selected": log.selected,
-                "random_pool": log.random_pool,
-            },
+            log=log.to_dict(),
         )
 
     return loan
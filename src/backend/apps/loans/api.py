@@ -1,10 +1,14 @@
 import uuid as uuid_module
+from decimal import Decimal
 from typing import Any, Optional
 
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, QuerySet
 from django.http import HttpRequest
 from ninja import Query, Router
 
 from apps.common.auth import jwt_auth, main_user_auth
+from apps.common.db import violated_constraint
 from apps.common.jalali import get_current_jalali
 from apps.loans.algorithm import run_loan_assignment
 from apps.loans.models import Loan, LoanState
@@ -15,18 +19,41 @@ from apps.loans.schemas import (
     LoanResponse,
     StartLoanResponse,
 )
+from apps.payments.models import LoanPayment
 from apps.users.models import User
 
 router = Router(tags=["loans"])
 
 
-def _build_loan_response(loan: Loan) -> LoanResponse:
-    """Helper to build a LoanResponse from a Loan ORM object."""
-    payments = loan.payments.select_related("payment").order_by(
-        "payment__jalali_year", "payment__jalali_month"
+def _loan_queryset() -> QuerySet[Loan]:
+    """Loans with everything _build_loan_response() reads prefetched."""
+    return (
+        Loan.objects.with_totals()
+        .select_related("user")
+        .prefetch_related(
+            Prefetch(
+                "payments",
+                queryset=LoanPayment.objects.select_related(
+                    "payment"
+                ).order_by("payment__jalali_year", "payment__jalali_month"),
+            )
+        )
     )
+
+
+def _build_loan_response(loan: Loan) -> LoanResponse:
+    """
+    Helper to build a LoanResponse from a Loan ORM object.
+
+    Loans fetched via _loan_queryset() are served from the prefetch cache and
+    the with_totals() annotation; other loans fall back to per-loan queries.
+
+    The schemas are built with model_construct(), skipping field validation:
+    every value comes straight from the ORM and already has the declared type.
+    """
+    payments = loan.payments.all()
     payment_summaries = [
-        LoanPaymentSummary(
+        LoanPaymentSummary.model_construct(
             id=lp.payment.id,
             amount=lp.amount,
             jalali_year=lp.payment.jalali_year,
@@ -42,7 +69,12 @@ def _build_loan_response(loan: Loan) -> LoanResponse:
         except Exception:
             username = None
 
-    return LoanResponse(
+    total_paid = loan.total_paid
+    remaining_balance = (
+        loan.amount - total_paid if loan.amount is not None else Decimal("0")
+    )
+
+    return LoanResponse.model_construct(
         id=loan.id,
         user_id=loan.user_id,
         username=username,
@@ -51,13 +83,18 @@ def _build_loan_response(loan: Loan) -> LoanResponse:
         jalali_year=loan.jalali_year,
         jalali_month=loan.jalali_month,
         min_amount_for_each_payment=loan.min_amount_for_each_payment,
-        total_paid=loan.total_paid,
-        remaining_balance=loan.remaining_balance,
+        total_paid=total_paid,
+        remaining_balance=remaining_balance,
         log=loan.log,
         payments=payment_summaries,
     )
 
 
+# Django-generated name of the unique (jalali_year, jalali_month) constraint
+# on loans, without the hash suffix
+_MONTH_UNIQUE_PREFIX = "loans_jalali_year_jalali_month_"
+
+
 @router.post(
     "/start",
     response={
@@ -85,20 +122,30 @@ def start_loan_assignment(request: HttpRequest) -> tuple[int, Any]:
     5. Creates Loan record (active or no_one)
     """
     jalali = get_current_jalali()
+    already_done = ErrorResponse(
+        detail=f"Loan assignment already done for {jalali.year}/{jalali.month}"
+    )
 
-    # Check if loan assignment already done for this month
-    if Loan.objects.filter(
-        jalali_year=jalali.year,
-        jalali_month=jalali.month,
-    ).exists():
-        return 409, ErrorResponse(
-            detail=f"Loan assignment already done for {jalali.year}/{jalali.month}"
-        )
-
+    # The check and the assignment run in one transaction; the unique
+    # (jalali_year, jalali_month) constraint decides concurrent calls that
+    # both pass the check, and the loser is rolled back and gets a 409. Any
+    # other integrity error is a bug and propagates.
     try:
-        loan = run_loan_assignment(jalali.year, jalali.month)
+        with transaction.atomic():
+            if Loan.objects.filter(
+                jalali_year=jalali.year,
+                jalali_month=jalali.month,
+            ).exists():
+                return 409, already_done
+
+            loan = run_loan_assignment(jalali.year, jalali.month)
     except ValueError as e:
         return 400, ErrorResponse(detail=str(e))
+    except IntegrityError as exc:
+        constraint = violated_constraint(exc) or ""
+        if constraint.startswith(_MONTH_UNIQUE_PREFIX):
+            return 409, already_done
+        raise
 
     loan_response = _build_loan_response(loan)
 
@@ -129,12 +176,10 @@ def get_all_loan_history(
     - jalali_year_lt: Filter loans with jalali_year < this value
     - jalali_month_gt: Filter loans with jalali_month > this value
     - jalali_month_lt: Filter loans with jalali_month < this value
+    - before_year/before_month: Only loans strictly before this Jalali month
+    - limit: Maximum number of loans to return
     """
-    qs = (
-        Loan.objects.select_related("user")
-        .prefetch_related("payments__payment")
-        .order_by("-jalali_year", "-jalali_month")
-    )
+    qs = _loan_queryset().order_by("-jalali_year", "-jalali_month")
 
     if filters.jalali_year_gt is not None:
         qs = qs.filter(jalali_year__gt=filters.jalali_year_gt)
@@ -144,6 +189,7 @@ def get_all_loan_history(
         qs = qs.filter(jalali_month__gt=filters.jalali_month_gt)
     if filters.jalali_month_lt is not None:
         qs = qs.filter(jalali_month__lt=filters.jalali_month_lt)
+    qs = filters.paginate(qs)
 
     return 200, [_build_loan_response(loan) for loan in qs]
 
@@ -158,9 +204,8 @@ def get_my_loan_history(request: HttpRequest) -> tuple[int, Any]:
     user: User = request.auth  # type: ignore[assignment]
 
     loans = (
-        Loan.objects.filter(user=user)
-        .select_related("user")
-        .prefetch_related("payments__payment")
+        _loan_queryset()
+        .filter(user=user)
         .order_by("-jalali_year", "-jalali_month")
     )
 
@@ -177,25 +222,19 @@ def get_my_loan_history(request: HttpRequest) -> tuple[int, Any]:
     },
     auth=jwt_auth,
 )
-def get_loan_detail(request: HttpRequest, loan_id: str) -> tuple[int, Any]:
+def get_loan_detail(
+    request: HttpRequest, loan_id: uuid_module.UUID
+) -> tuple[int, Any]:
     """
     Get details of a specific loan.
     - is_main users can see any loan
     - Regular users can only see their own loans
+    - Malformed loan IDs are rejected by ninja's path validation (422)
     """
     user: User = request.auth  # type: ignore[assignment]
 
     try:
-        loan_uuid = uuid_module.UUID(loan_id)
-    except ValueError:
-        return 404, ErrorResponse(detail="Invalid loan ID format")
-
-    try:
-        loan = (
-            Loan.objects.select_related("user")
-            .prefetch_related("payments__payment")
-            .get(id=loan_uuid)
-        )
+        loan = _loan_queryset().get(id=loan_id)
     except Loan.DoesNotExist:
         return 404, ErrorResponse(detail="Loan not found")
 
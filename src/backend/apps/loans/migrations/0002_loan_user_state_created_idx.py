@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("loans", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="loan",
+            index=models.Index(
+                fields=["user", "state", "-created_at"],
+                name="loan_user_state_created_idx",
+            ),
+        ),
+    ]
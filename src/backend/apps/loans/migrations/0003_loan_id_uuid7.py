@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+import apps.common.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("loans", "0002_loan_user_state_created_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="loan",
+            name="id",
+            field=models.UUIDField(
+                default=apps.common.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
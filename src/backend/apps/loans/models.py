@@ -3,6 +3,9 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.db import models
+from django.utils.functional import cached_property
+
+from apps.common.ids import uuid7
 
 
 class LoanState(models.TextChoices):
@@ -11,6 +14,22 @@ class LoanState(models.TextChoices):
     NO_ONE = "no_one", "No One"
 
 
+class LoanQuerySet(models.QuerySet):
+    def with_totals(self) -> "LoanQuerySet":
+        """
+        Annotate each loan's repaid sum as total_paid_db in the same query.
+
+        Loan.total_paid (and so remaining_balance/is_settled) reads the
+        annotation instead of running its own SUM query per loan.
+        """
+        from django.db.models import Sum
+        from django.db.models.functions import Coalesce
+
+        return self.annotate(
+            total_paid_db=Coalesce(Sum("payments__amount"), Decimal("0"))
+        )
+
+
 class Loan(models.Model):
     """
     Represents a monthly loan assignment.
@@ -25,12 +44,14 @@ class Loan(models.Model):
          - participated: list of {user_id, username, point}
          - selected: user_id of winner or null
          - random_pool: list of user_ids that were in the random selection pool
+         - seed: seed of the winner draw (null if there was no draw); passing
+           it to run_loan_assignment() replays the selection
 
     min_amount_for_each_payment: Copied from Config at time of loan creation.
     """
 
     id: uuid.UUID = models.UUIDField(
-        primary_key=True, default=uuid.uuid4, editable=False
+        primary_key=True, default=uuid7, editable=False
     )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -55,21 +76,46 @@ class Loan(models.Model):
     )
     log = models.JSONField(default=dict)
 
+    objects = LoanQuerySet.as_manager()
+
     class Meta:
         db_table = "loans"
         unique_together = [("jalali_year", "jalali_month")]
+        indexes = [
+            # Serves the per-user active-loan lookups (has_active_loan, scoring)
+            # and, via its created_at suffix, "most recent active loan" ordering.
+            models.Index(
+                fields=["user", "state", "-created_at"],
+                name="loan_user_state_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Loan({self.jalali_year}/{self.jalali_month}, state={self.state}, user={self.user_id})"
 
-    @property
+    @cached_property
     def total_paid(self) -> Decimal:
-        """Sum of all loan payments made so far."""
+        """
+        Sum of all loan payments made so far.
+
+        Uses the total_paid_db annotation from LoanQuerySet.with_totals() when
+        present, otherwise aggregates in its own query. The value is cached on
+        the instance; call invalidate_totals() after adding payments to it.
+        """
+        annotated: Decimal | None = getattr(self, "total_paid_db", None)
+        if annotated is not None:
+            return annotated
+
         from django.db.models import Sum
 
         result = self.payments.aggregate(total=Sum("amount"))["total"]
         return result or Decimal("0")
 
+    def invalidate_totals(self) -> None:
+        """Drop the cached total_paid (and any with_totals() annotation)."""
+        self.__dict__.pop("total_paid", None)
+        self.__dict__.pop("total_paid_db", None)
+
     @property
     def remaining_balance(self) -> Decimal:
         """Remaining amount to be repaid."""
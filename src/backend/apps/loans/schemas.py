@@ -4,6 +4,8 @@ from typing import Any, Optional
 
 from pydantic import BaseModel
 
+from apps.common.schemas import JalaliMonthPage
+
 
 class LoanPaymentSummary(BaseModel):
     id: uuid.UUID
@@ -40,7 +42,9 @@ class ErrorResponse(BaseModel):
     detail: str
 
 
-class LoanHistoryFilters(BaseModel):
+class LoanHistoryFilters(JalaliMonthPage):
+    """Range filters plus keyset pagination for GET /history (newest first)."""
+
     jalali_year_gt: Optional[int] = None
     jalali_year_lt: Optional[int] = None
     jalali_month_gt: Optional[int] = None
@@ -9,11 +9,22 @@ Tests cover:
 - Users with zero loan_request_amount are excluded
 """
 
+import itertools
+from collections.abc import Iterable
 from decimal import Decimal
-
-from django.test import TestCase
-
-from apps.loans.algorithm import compute_user_score, run_loan_assignment
+from typing import Any
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
+
+from apps.loans.algorithm import (
+    collect_score_inputs,
+    compute_user_score,
+    run_loan_assignment,
+    score_denominator,
+)
 from apps.loans.models import Loan, LoanState
 from apps.payments.models import Config, LoanPayment, Payment
 from apps.users.models import User
@@ -24,22 +35,94 @@ from apps.users.models import User
 # ---------------------------------------------------------------------------
 
 
+# Amounts shared by many tests, built once instead of parsed at every use
+_D0 = Decimal("0")
+_D1 = Decimal("1.00000000")
+_D20 = Decimal("20.00000000")
+_D100 = Decimal("100.00000000")
+_D200 = Decimal("200.00000000")
+_D300 = Decimal("300.00000000")
+_D500 = Decimal("500.00000000")
+
+# Every test user shares the same password, so it is hashed once at import
+# time instead of running the password hasher for every created user.
+_HASHED_PW = make_password("pass123")
+
+# Source of unique placeholder Bitpin IDs for payments whose ID is irrelevant
+_BP_COUNTER = itertools.count()
+
+# Source of unique loan months for loans whose month is irrelevant; loans are
+# unique per (jalali_year, jalali_month), so fixture loans must not share one
+_LOAN_PERIOD_COUNTER = itertools.count()
+
+
+def next_loan_period() -> tuple[int, int]:
+    """Return an unused (jalali_year, jalali_month), counting up from 1300/1."""
+    n = next(_LOAN_PERIOD_COUNTER)
+    return 1300 + n // 12, n % 12 + 1
+
+
+def make_users_bulk(specs: list[dict[str, Any]]) -> list[User]:
+    """
+    Create Users in a single INSERT.
+
+    Each spec holds the make_user() keyword arguments (username required).
+    """
+    users = [
+        User(
+            username=spec["username"],
+            password=_HASHED_PW,
+            balance=spec.get("balance", _D100),
+            loan_request_amount=spec.get(
+                "loan_request_amount", Decimal("50.00000000")
+            ),
+            is_main=spec.get("is_main", False),
+            is_active=spec.get("is_active", True),
+        )
+        for spec in specs
+    ]
+    return User.objects.bulk_create(users)
+
+
 def make_user(
     username: str,
-    balance: Decimal = Decimal("100.00000000"),
+    balance: Decimal = _D100,
     loan_request_amount: Decimal = Decimal("50.00000000"),
     is_main: bool = False,
     is_active: bool = True,
 ) -> User:
     """Create and return a User with the given attributes."""
-    return User.objects.create_user(
-        username=username,
-        password="pass123",
-        balance=balance,
-        loan_request_amount=loan_request_amount,
-        is_main=is_main,
-        is_active=is_active,
-    )
+    return make_users_bulk(
+        [
+            {
+                "username": username,
+                "balance": balance,
+                "loan_request_amount": loan_request_amount,
+                "is_main": is_main,
+                "is_active": is_active,
+            }
+        ]
+    )[0]
+
+
+def make_payments_bulk(
+    user: User,
+    amount: Decimal,
+    jalali_year: int,
+    jalali_months: Iterable[int],
+) -> list[Payment]:
+    """Create one Payment per given month for the user in a single INSERT."""
+    payments = [
+        Payment(
+            user=user,
+            amount=amount,
+            jalali_year=jalali_year,
+            jalali_month=month,
+            bitpin_payment_id=f"bp_{next(_BP_COUNTER)}",
+        )
+        for month in jalali_months
+    ]
+    return Payment.objects.bulk_create(payments)
 
 
 def make_payment(
@@ -55,8 +138,7 @@ def make_payment(
         amount=amount,
         jalali_year=jalali_year,
         jalali_month=jalali_month,
-        bitpin_payment_id=bitpin_id
-        or f"bp_{user.username}_{jalali_year}_{jalali_month}",
+        bitpin_payment_id=bitpin_id or f"bp_{next(_BP_COUNTER)}",
     )
 
 
@@ -68,12 +150,15 @@ def make_loan_payment(
     jalali_month: int,
 ) -> LoanPayment:
     """Create a Payment + LoanPayment for the given user and loan."""
-    payment = make_payment(user, amount, jalali_year, jalali_month)
-    return LoanPayment.objects.create(
-        payment=payment,
-        loan=loan,
-        amount=amount,
-    )
+    # Multi-row fixtures use atomic(savepoint=False): outside a test transaction
+    # the inserts commit together, inside TestCase's they add no SAVEPOINT.
+    with transaction.atomic(savepoint=False):
+        payment = make_payment(user, amount, jalali_year, jalali_month)
+        return LoanPayment.objects.create(
+            payment=payment,
+            loan=loan,
+            amount=amount,
+        )
 
 
 def make_active_loan(
@@ -81,7 +166,7 @@ def make_active_loan(
     amount: Decimal,
     jalali_year: int,
     jalali_month: int,
-    min_payment: Decimal = Decimal("20.00000000"),
+    min_payment: Decimal = _D20,
 ) -> Loan:
     """Create an ACTIVE loan for the given user."""
     return Loan.objects.create(
@@ -94,14 +179,41 @@ def make_active_loan(
     )
 
 
+@transaction.atomic(savepoint=False)
+def make_user_with_loan_history(
+    username: str,
+    balance: Decimal = _D500,
+    loan_request_amount: Decimal = _D100,
+    loan_amount: Decimal = _D200,
+    membership_payment_amount: Decimal = _D20,
+    loan_payment_amount: Decimal = _D20,
+) -> User:
+    """
+    Create a user whose score denominator is > 0:
+    - a membership payment (1403/1)
+    - an active loan in a month of its own (see next_loan_period())
+    - a loan payment (1403/2), so total_user_loan_payments > 0
+
+    With the defaults every log() factor is positive too, so the score is a
+    positive Decimal.
+    """
+    user = make_user(
+        username, balance=balance, loan_request_amount=loan_request_amount
+    )
+    make_payment(user, membership_payment_amount, 1403, 1)
+    loan = make_active_loan(user, loan_amount, *next_loan_period())
+    make_loan_payment(user, loan, loan_payment_amount, 1403, 2)
+    return user
+
+
 def get_or_create_config() -> Config:
     """Get or create the singleton Config."""
     config, _ = Config.objects.get_or_create(
         pk=1,
         defaults={
-            "min_membership_fee": Decimal("20.00000000"),
+            "min_membership_fee": _D20,
             "max_month_for_loan_payment": 24,
-            "min_amount_for_loan_payment": Decimal("20.00000000"),
+            "min_amount_for_loan_payment": _D20,
         },
     )
     return config
@@ -112,278 +224,218 @@ def get_or_create_config() -> Config:
 # ---------------------------------------------------------------------------
 
 
-class TestComputeUserScoreReturnsNone(TestCase):
+class TestComputeUserScore(TestCase):
     """
-    Tests for cases where compute_user_score() should return None (unlimited score).
+    Tests for compute_user_score(), one fixture user per scenario.
 
-    None is returned when any denominator factor is zero/missing.
+    - None (unlimited) when any denominator factor is zero/missing
+    - Decimal('0') when the denominator is > 0 but the numerator is <= 0
+    - a positive Decimal otherwise
     """
 
-    def test_returns_none_when_no_payment_history(self):
-        """User with no payments gets None (unlimited) score."""
-        user = make_user(
-            "nohistory", loan_request_amount=Decimal("50.00000000")
+    @classmethod
+    def setUpTestData(cls):
+        # Users whose denominator is 0 → None
+        (
+            cls.no_history_user,
+            cls.no_loan_payments_user,
+            cls.no_active_loans_user,
+            cls.zero_request_user,
+            cls.one_request_user,
+        ) = make_users_bulk(
+            [
+                {"username": "nohistory"},
+                {"username": "noloanpay", "balance": _D200},
+                {"username": "noactiveloan", "balance": _D200},
+                {"username": "zeroloan", "loan_request_amount": _D0},
+                {"username": "oneloan", "loan_request_amount": _D1},
+            ]
+        )
+        for user in (
+            cls.no_loan_payments_user,
+            cls.no_active_loans_user,
+            cls.zero_request_user,
+            cls.one_request_user,
+        ):
+            make_payment(user, _D20, 1403, 1)
+        # A loan payment towards a loan that is not ACTIVE
+        inactive_year, inactive_month = next_loan_period()
+        inactive_loan = Loan.objects.create(
+            user=cls.no_active_loans_user,
+            amount=_D100,
+            state=LoanState.INITIAL,
+            jalali_year=inactive_year,
+            jalali_month=inactive_month,
+        )
+        make_loan_payment(
+            cls.no_active_loans_user, inactive_loan, _D20, 1403, 2
         )
 
-        score = compute_user_score(user)
+        # Users whose numerator is 0 → Decimal('0')
+        cls.zero_balance_user = make_user_with_loan_history(
+            "zerobal", balance=_D0, loan_amount=_D100
+        )
+        cls.one_balance_user = make_user_with_loan_history(
+            "onebal", balance=_D1, loan_amount=_D100
+        )
 
-        assert score is None
+        # Positive scores: the baseline and, for the monotonicity test,
+        # variants that differ from it in a single score input
+        cls.qualified_user = make_user_with_loan_history("qualified")
+        cls.low_balance_user = make_user_with_loan_history(
+            "lowbal", balance=Decimal("10.00000000")
+        )
+        cls.high_balance_user = make_user_with_loan_history(
+            "highbal", balance=Decimal("1000.00000000")
+        )
+        cls.small_request_user = make_user_with_loan_history(
+            "smallreq", loan_request_amount=Decimal("10.00000000")
+        )
+        cls.large_request_user = make_user_with_loan_history(
+            "largereq", loan_request_amount=_D500
+        )
+        # Like the baseline, but with 5 membership payments before the loan
+        # payment (more months without a loan)
+        cls.many_months_user = make_user(
+            "manymonths", balance=_D500, loan_request_amount=_D100
+        )
+        make_payments_bulk(cls.many_months_user, _D20, 1403, range(1, 6))
+        loan = make_active_loan(
+            cls.many_months_user, _D200, *next_loan_period()
+        )
+        make_loan_payment(cls.many_months_user, loan, _D20, 1403, 6)
+
+    def test_returns_none_when_no_payment_history(self):
+        """User with no payments gets None (unlimited) score."""
+        self.assertIsNone(compute_user_score(self.no_history_user))
 
     def test_returns_none_when_no_loan_payments(self):
         """User who has paid membership fees but never made loan payments gets None."""
-        user = make_user("noloanpay", balance=Decimal("200.00000000"))
-        # Has a payment record but no LoanPayment
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
-
-        score = compute_user_score(user)
-
-        assert score is None
+        self.assertIsNone(compute_user_score(self.no_loan_payments_user))
 
     def test_returns_none_when_no_active_loans(self):
         """User with payment history and loan payments but no active loans gets None."""
-        user = make_user("noactiveloan", balance=Decimal("200.00000000"))
-        # Create a payment
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
-        # Create a loan payment without an active loan (use a different loan)
-        loan = Loan.objects.create(
-            user=user,
-            amount=Decimal("100.00000000"),
-            state=LoanState.INITIAL,  # Not ACTIVE
-            jalali_year=1402,
-            jalali_month=1,
-        )
-        make_loan_payment(user, loan, Decimal("20.00000000"), 1403, 2)
-
-        score = compute_user_score(user)
-
         # total_loan_amount_user_get queries ACTIVE loans only → 0 → None
-        assert score is None
+        self.assertIsNone(compute_user_score(self.no_active_loans_user))
 
     def test_returns_none_when_loan_request_amount_is_zero(self):
         """User with loan_request_amount=0 gets None (log(0) is undefined)."""
-        user = make_user("zeroloan", loan_request_amount=Decimal("0"))
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
-
-        score = compute_user_score(user)
-
-        assert score is None
+        self.assertIsNone(compute_user_score(self.zero_request_user))
 
     def test_returns_none_when_loan_request_amount_is_one(self):
         """User with loan_request_amount=1 gets None (log(1)=0 → denominator=0)."""
-        user = make_user("oneloan", loan_request_amount=Decimal("1.00000000"))
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
-
-        score = compute_user_score(user)
-
-        # log(1) = 0 → denominator factor is 0 → None
-        assert score is None
-
-
-class TestComputeUserScoreReturnsZero(TestCase):
-    """
-    Tests for cases where compute_user_score() returns Decimal('0').
-
-    Zero is returned when denominator > 0 but numerator <= 0.
-    """
-
-    def _setup_user_with_active_loan_and_payments(
-        self,
-        username: str,
-        balance: Decimal,
-        loan_request_amount: Decimal,
-        loan_amount: Decimal,
-    ):
-        """
-        Set up a user who:
-        - Has a payment record
-        - Has an active loan
-        - Has made loan payments
-        This ensures the denominator is > 0.
-        """
-        user = make_user(
-            username, balance=balance, loan_request_amount=loan_request_amount
-        )
-        # Membership payment
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
-        # Active loan
-        loan = make_active_loan(user, loan_amount, 1402, 1)
-        # Loan payment (makes total_user_loan_payments > 0)
-        make_loan_payment(user, loan, Decimal("20.00000000"), 1403, 2)
-        return user, loan
+        self.assertIsNone(compute_user_score(self.one_request_user))
 
     def test_returns_zero_when_balance_is_zero(self):
         """
         User with balance=0 gets score=0 because log(balance) factor in numerator is 0.
         """
-        user, _ = self._setup_user_with_active_loan_and_payments(
-            username="zerobal",
-            balance=Decimal("0"),
-            loan_request_amount=Decimal("100.00000000"),
-            loan_amount=Decimal("100.00000000"),
-        )
-
-        score = compute_user_score(user)
-
-        # numerator has log(balance)=0 → numerator=0 → score=0
-        assert score == Decimal("0")
+        self.assertEqual(compute_user_score(self.zero_balance_user), _D0)
 
     def test_returns_zero_when_balance_is_one(self):
         """
         User with balance=1 gets score=0 because log(1)=0 → numerator=0.
         """
-        user, _ = self._setup_user_with_active_loan_and_payments(
-            username="onebal",
-            balance=Decimal("1.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
-            loan_amount=Decimal("100.00000000"),
-        )
-
-        score = compute_user_score(user)
-
-        assert score == Decimal("0")
-
-
-class TestComputeUserScorePositive(TestCase):
-    """
-    Tests for cases where compute_user_score() returns a positive Decimal.
-    """
-
-    def _setup_full_user(
-        self,
-        username: str,
-        balance: Decimal = Decimal("500.00000000"),
-        loan_request_amount: Decimal = Decimal("100.00000000"),
-        loan_amount: Decimal = Decimal("200.00000000"),
-        membership_payment_amount: Decimal = Decimal("20.00000000"),
-        loan_payment_amount: Decimal = Decimal("20.00000000"),
-    ) -> User:
-        """
-        Create a user with all the data needed for a positive score:
-        - balance > e (so log(balance) > 0)
-        - loan_request_amount > e (so log(loan_request_amount) > 0)
-        - active loan with amount > e (so log(loan_amount) > 0)
-        - at least one loan payment
-        - at least one membership payment
-        """
-        user = make_user(
-            username, balance=balance, loan_request_amount=loan_request_amount
-        )
-        # Membership payment (most recent)
-        make_payment(user, membership_payment_amount, 1403, 1)
-        # Active loan
-        loan = make_active_loan(user, loan_amount, 1402, 1)
-        # Loan payment
-        make_loan_payment(user, loan, loan_payment_amount, 1403, 2)
-        return user
+        self.assertEqual(compute_user_score(self.one_balance_user), _D0)
 
     def test_returns_positive_decimal_for_well_qualified_user(self):
         """A user with good history gets a positive Decimal score."""
-        user = self._setup_full_user("qualified")
+        score = compute_user_score(self.qualified_user)
 
-        score = compute_user_score(user)
-
-        assert score is not None
-        assert score > Decimal("0")
+        self.assertIsNotNone(score)
+        self.assertGreater(score, _D0)
 
     def test_score_is_decimal_type(self):
         """compute_user_score returns a Decimal (not float or int)."""
-        user = self._setup_full_user("decimaltype")
-
-        score = compute_user_score(user)
-
-        assert score is not None
-        assert isinstance(score, Decimal)
-
-    def test_higher_balance_increases_score(self):
-        """
-        A user with higher balance (all else equal) should have a higher score,
-        because log(balance) is a numerator factor.
-        """
-        user_low = self._setup_full_user(
-            "lowbal",
-            balance=Decimal("10.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
-            loan_amount=Decimal("200.00000000"),
-        )
-        user_high = self._setup_full_user(
-            "highbal",
-            balance=Decimal("1000.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
-            loan_amount=Decimal("200.00000000"),
-        )
-
-        score_low = compute_user_score(user_low)
-        score_high = compute_user_score(user_high)
+        score = compute_user_score(self.qualified_user)
 
-        # Both should be positive
-        assert score_low is not None and score_low > 0
-        assert score_high is not None and score_high > 0
-        # Higher balance → higher score
-        assert score_high > score_low
+        self.assertIsNotNone(score)
+        self.assertIsInstance(score, Decimal)
 
-    def test_higher_loan_request_decreases_score(self):
+    def test_score_monotonicity(self):
         """
-        A user requesting a larger loan (all else equal) should have a lower score,
-        because log(loan_request_amount) is a denominator factor.
+        Changing one input (all else equal) moves the score the expected way:
+        - higher balance → higher score (log(balance) is a numerator factor)
+        - larger loan request → lower score (log(loan_request_amount) is a
+          denominator factor)
+        - more months paid without a loan → higher score (total_month_no_loan
+          is a numerator factor)
         """
-        user_small_req = self._setup_full_user(
-            "smallreq",
-            balance=Decimal("500.00000000"),
-            loan_request_amount=Decimal("10.00000000"),
-            loan_amount=Decimal("200.00000000"),
-        )
-        user_large_req = self._setup_full_user(
-            "largereq",
-            balance=Decimal("500.00000000"),
-            loan_request_amount=Decimal("500.00000000"),
-            loan_amount=Decimal("200.00000000"),
-        )
-
-        score_small = compute_user_score(user_small_req)
-        score_large = compute_user_score(user_large_req)
-
-        # Both should be positive
-        assert score_small is not None and score_small > 0
-        assert score_large is not None and score_large > 0
-        # Smaller request → higher score
-        assert score_small > score_large
-
-    def test_more_months_no_loan_increases_score(self):
-        """
-        A user with more months paying without a loan (all else equal) should have
-        a higher score, because total_month_no_loan is a numerator factor.
-        """
-        # User with 1 membership payment (no extra months without loan)
-        user_few = make_user(
-            "fewmonths",
-            balance=Decimal("500.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
-        )
-        make_payment(user_few, Decimal("20.00000000"), 1403, 1)
-        loan_few = make_active_loan(user_few, Decimal("200.00000000"), 1402, 1)
-        make_loan_payment(user_few, loan_few, Decimal("20.00000000"), 1403, 2)
-
-        # User with 5 membership payments (more months without loan)
-        user_many = make_user(
-            "manymonths",
-            balance=Decimal("500.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
-        )
-        for month in range(1, 6):
-            make_payment(user_many, Decimal("20.00000000"), 1403, month)
-        loan_many = make_active_loan(
-            user_many, Decimal("200.00000000"), 1402, 1
-        )
-        make_loan_payment(
-            user_many, loan_many, Decimal("20.00000000"), 1403, 6
-        )
-
-        score_few = compute_user_score(user_few)
-        score_many = compute_user_score(user_many)
-
-        assert score_few is not None and score_few > 0
-        assert score_many is not None and score_many > 0
-        assert score_many > score_few
+        cases = [
+            ("higher balance", self.low_balance_user, self.high_balance_user),
+            ("smaller request", self.large_request_user, self.small_request_user),
+            ("more months", self.qualified_user, self.many_months_user),
+        ]
+        for name, user_lower, user_higher in cases:
+            with self.subTest(name):
+                score_lower = compute_user_score(user_lower)
+                score_higher = compute_user_score(user_higher)
+
+                # Both should be positive
+                self.assertIsNotNone(score_lower)
+                self.assertGreater(score_lower, 0)
+                self.assertIsNotNone(score_higher)
+                self.assertGreater(score_higher, 0)
+                self.assertGreater(score_higher, score_lower)
+
+
+class TestCollectScoreInputs(TestCase):
+    """Tests for the batched collect_score_inputs() helper."""
+
+    def test_query_count_is_independent_of_user_count(self):
+        """Inputs for many users are fetched in a fixed number of queries."""
+        users = []
+        for i in range(5):
+            user = make_user(f"batch{i}", balance=_D500)
+            make_payment(user, _D20, 1403, 1)
+            loan = make_active_loan(user, _D200, 1400 + i, 1)
+            make_loan_payment(user, loan, _D20, 1403, 2)
+            users.append(user)
+
+        with self.assertNumQueries(4):
+            inputs = collect_score_inputs([u.id for u in users])
+
+        self.assertEqual(set(inputs), {u.id for u in users})
+
+    def test_batched_inputs_match_single_user_score(self):
+        """Scores from batched inputs equal scores computed per user."""
+        user = make_user("batchscore", balance=_D500)
+        for month in range(1, 4):
+            make_payment(user, _D20, 1403, month)
+        loan = make_active_loan(user, _D200, 1402, 1)
+        make_loan_payment(user, loan, Decimal("30.00000000"), 1403, 4)
+        other = make_user("batchother")
+
+        inputs = collect_score_inputs([user.id, other.id])
+
+        self.assertEqual(
+            inputs[user.id].last_payment_amount, Decimal("30.00000000")
+        )
+        self.assertEqual(inputs[user.id].total_payments_count, 4)
+        self.assertEqual(inputs[user.id].total_loan_payments, 1)
+        self.assertEqual(
+            inputs[user.id].previous_loan_amount, _D200
+        )
+        self.assertIsNone(inputs[other.id].last_payment_amount)
+        self.assertEqual(
+            compute_user_score(user, inputs[user.id]), compute_user_score(user)
+        )
+
+    def test_score_denominator_none_matches_unlimited_score(self):
+        """score_denominator() is None exactly when the score is unlimited."""
+        unlimited = make_user("denomnone")
+        finite = make_user("denomfinite", balance=_D500)
+        make_payment(finite, _D20, 1403, 1)
+        loan = make_active_loan(finite, _D200, 1402, 1)
+        make_loan_payment(finite, loan, _D20, 1403, 2)
+
+        inputs = collect_score_inputs([unlimited.id, finite.id])
+
+        self.assertIsNone(score_denominator(unlimited, inputs[unlimited.id]))
+        self.assertIsNone(compute_user_score(unlimited, inputs[unlimited.id]))
+        denominator = score_denominator(finite, inputs[finite.id])
+        self.assertIsNotNone(denominator)
+        self.assertGreater(denominator, 0)
 
 
 # ---------------------------------------------------------------------------
@@ -394,7 +446,8 @@ class TestComputeUserScorePositive(TestCase):
 class TestRunLoanAssignmentNoEligibleUsers(TestCase):
     """Tests for run_loan_assignment() when no users are eligible."""
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         get_or_create_config()
 
     def test_no_active_users_raises_value_error(self):
@@ -405,84 +458,86 @@ class TestRunLoanAssignmentNoEligibleUsers(TestCase):
         # No users → no unpaid users → should create NO_ONE loan
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.NO_ONE
-        assert loan.jalali_year == 1403
-        assert loan.jalali_month == 1
+        self.assertEqual(loan.state, LoanState.NO_ONE)
+        self.assertEqual(loan.jalali_year, 1403)
+        self.assertEqual(loan.jalali_month, 1)
 
     def test_raises_value_error_when_user_has_not_paid(self):
         """run_loan_assignment raises ValueError if an active user hasn't paid."""
-        user = make_user("unpaid", balance=Decimal("100.00000000"))
+        user = make_user("unpaid", balance=_D100)
         # No payment for this month
 
         with self.assertRaises(ValueError) as ctx:
             run_loan_assignment(1403, 2)
 
-        assert "unpaid" in str(ctx.exception)
+        self.assertIn("unpaid", str(ctx.exception))
 
     def test_all_users_have_active_loans_creates_no_one_loan(self):
         """When all eligible users have active loans, creates a NO_ONE loan."""
         user = make_user(
             "activeloanuser",
-            balance=Decimal("200.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D200,
+            loan_request_amount=_D100,
         )
         # Pay for this month
-        make_payment(user, Decimal("20.00000000"), 1403, 3)
+        make_payment(user, _D20, 1403, 3)
         # Give user an active loan
-        make_active_loan(user, Decimal("100.00000000"), 1402, 1)
+        make_active_loan(user, _D100, 1402, 1)
 
         loan = run_loan_assignment(1403, 3)
 
-        assert loan.state == LoanState.NO_ONE
-        assert (
-            loan.log["not_participated"][0]["reason"]
-            == "User has an active loan"
+        self.assertEqual(loan.state, LoanState.NO_ONE)
+        self.assertEqual(
+            loan.log["not_participated"][0]["reason"],
+            "User has an active loan",
         )
 
     def test_all_users_have_zero_loan_request_creates_no_one_loan(self):
         """When all users have loan_request_amount=0, creates a NO_ONE loan."""
         user = make_user(
             "optedout",
-            balance=Decimal("200.00000000"),
-            loan_request_amount=Decimal("0"),
+            balance=_D200,
+            loan_request_amount=_D0,
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 4)
+        make_payment(user, _D20, 1403, 4)
 
         loan = run_loan_assignment(1403, 4)
 
-        assert loan.state == LoanState.NO_ONE
-        assert "opted out" in loan.log["not_participated"][0]["reason"]
+        self.assertEqual(loan.state, LoanState.NO_ONE)
+        self.assertIn("opted out", loan.log["not_participated"][0]["reason"])
 
     def test_user_excluded_when_loan_request_exceeds_balance(self):
         """Non-main user with loan_request_amount > balance is excluded."""
         user = make_user(
             "overrequest",
             balance=Decimal("50.00000000"),
-            loan_request_amount=Decimal("200.00000000"),  # > balance
+            loan_request_amount=_D200,  # > balance
             is_main=False,
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 5)
+        make_payment(user, _D20, 1403, 5)
 
         loan = run_loan_assignment(1403, 5)
 
-        assert loan.state == LoanState.NO_ONE
+        self.assertEqual(loan.state, LoanState.NO_ONE)
         not_participated = loan.log["not_participated"]
-        assert any(
-            "loan_request_amount" in e["reason"] for e in not_participated
+        self.assertTrue(
+            any("loan_request_amount" in e["reason"] for e in not_participated)
         )
 
 
 class TestRunLoanAssignmentSingleUser(TestCase):
     """Tests for run_loan_assignment() with a single eligible user."""
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         get_or_create_config()
 
+    @transaction.atomic(savepoint=False)
     def _setup_eligible_user(
         self,
         username: str = "winner",
-        balance: Decimal = Decimal("500.00000000"),
-        loan_request_amount: Decimal = Decimal("100.00000000"),
+        balance: Decimal = _D500,
+        loan_request_amount: Decimal = _D100,
         jalali_year: int = 1403,
         jalali_month: int = 1,
     ) -> User:
@@ -490,7 +545,7 @@ class TestRunLoanAssignmentSingleUser(TestCase):
         user = make_user(
             username, balance=balance, loan_request_amount=loan_request_amount
         )
-        make_payment(user, Decimal("20.00000000"), jalali_year, jalali_month)
+        make_payment(user, _D20, jalali_year, jalali_month)
         return user
 
     def test_single_eligible_user_wins_loan(self):
@@ -499,11 +554,11 @@ class TestRunLoanAssignmentSingleUser(TestCase):
 
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.ACTIVE
-        assert loan.user == user
-        assert loan.amount == Decimal("100.00000000")
-        assert loan.jalali_year == 1403
-        assert loan.jalali_month == 1
+        self.assertEqual(loan.state, LoanState.ACTIVE)
+        self.assertEqual(loan.user, user)
+        self.assertEqual(loan.amount, _D100)
+        self.assertEqual(loan.jalali_year, 1403)
+        self.assertEqual(loan.jalali_month, 1)
 
     def test_loan_amount_matches_user_request(self):
         """Loan amount equals the winner's loan_request_amount."""
@@ -515,7 +570,7 @@ class TestRunLoanAssignmentSingleUser(TestCase):
 
         loan = run_loan_assignment(1403, 2)
 
-        assert loan.amount == Decimal("75.00000000")
+        self.assertEqual(loan.amount, Decimal("75.00000000"))
 
     def test_loan_log_contains_winner(self):
         """Loan log records the selected user_id."""
@@ -523,7 +578,7 @@ class TestRunLoanAssignmentSingleUser(TestCase):
 
         loan = run_loan_assignment(1403, 3)
 
-        assert loan.log["selected"] == user.id
+        self.assertEqual(loan.log["selected"], user.id)
 
     def test_loan_log_contains_participated_entry(self):
         """Loan log records the user in the participated list."""
@@ -532,9 +587,9 @@ class TestRunLoanAssignmentSingleUser(TestCase):
         loan = run_loan_assignment(1403, 4)
 
         participated = loan.log["participated"]
-        assert len(participated) == 1
-        assert participated[0]["user_id"] == user.id
-        assert participated[0]["username"] == user.username
+        self.assertEqual(len(participated), 1)
+        self.assertEqual(participated[0]["user_id"], user.id)
+        self.assertEqual(participated[0]["username"], user.username)
 
     def test_loan_min_payment_set_from_config(self):
         """Loan min_amount_for_each_payment is set from Config."""
@@ -543,9 +598,9 @@ class TestRunLoanAssignmentSingleUser(TestCase):
 
         loan = run_loan_assignment(1403, 5)
 
-        assert (
-            loan.min_amount_for_each_payment
-            == config.min_amount_for_loan_payment
+        self.assertEqual(
+            loan.min_amount_for_each_payment,
+            config.min_amount_for_loan_payment,
         )
 
     def test_no_one_loan_when_request_exceeds_saghat_balance(self):
@@ -558,14 +613,14 @@ class TestRunLoanAssignmentSingleUser(TestCase):
             balance=Decimal("10.00000000"),
             loan_request_amount=Decimal("10.00000000"),
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 6)
+        make_payment(user, _D20, 1403, 6)
         # saghat_balance = sum of all user balances = 10
         # loan_request_amount = 10 → 10 <= 10 → should be fundable
 
         loan = run_loan_assignment(1403, 6)
 
         # 10 <= 10 so it should be funded
-        assert loan.state == LoanState.ACTIVE
+        self.assertEqual(loan.state, LoanState.ACTIVE)
 
     def test_no_one_loan_when_request_strictly_exceeds_saghat_balance(self):
         """
@@ -577,19 +632,20 @@ class TestRunLoanAssignmentSingleUser(TestCase):
             loan_request_amount=Decimal("11.00000000"),  # > balance
             is_main=True,  # is_main bypasses the balance check for eligibility
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 7)
+        make_payment(user, _D20, 1403, 7)
 
         loan = run_loan_assignment(1403, 7)
 
         # saghat_balance = 10, loan_request = 11 → not fundable
-        assert loan.state == LoanState.NO_ONE
-        assert "saghat_balance" in loan.log.get("note", "")
+        self.assertEqual(loan.state, LoanState.NO_ONE)
+        self.assertIn("saghat_balance", loan.log.get("note", ""))
 
 
 class TestRunLoanAssignmentMultipleUsers(TestCase):
     """Tests for run_loan_assignment() with multiple eligible users."""
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         get_or_create_config()
 
     def test_user_with_active_loan_excluded_from_multiple(self):
@@ -597,29 +653,29 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
         # User 1: has active loan → excluded
         user1 = make_user(
             "hasloan",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user1, Decimal("20.00000000"), 1403, 1)
-        make_active_loan(user1, Decimal("100.00000000"), 1402, 1)
+        make_payment(user1, _D20, 1403, 1)
+        make_active_loan(user1, _D100, 1402, 1)
 
         # User 2: eligible
         user2 = make_user(
             "eligible",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user2, Decimal("20.00000000"), 1403, 1)
+        make_payment(user2, _D20, 1403, 1)
 
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.ACTIVE
-        assert loan.user == user2
+        self.assertEqual(loan.state, LoanState.ACTIVE)
+        self.assertEqual(loan.user, user2)
         # user1 should be in not_participated
         not_participated_ids = [
             e["user_id"] for e in loan.log["not_participated"]
         ]
-        assert user1.id in not_participated_ids
+        self.assertIn(user1.id, not_participated_ids)
 
     def test_winner_selected_from_unlimited_score_pool(self):
         """
@@ -628,24 +684,88 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
         # Both users have no payment history → unlimited score
         user1 = make_user(
             "unlimited1",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user1, Decimal("20.00000000"), 1403, 1)
+        make_payment(user1, _D20, 1403, 1)
 
         user2 = make_user(
             "unlimited2",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user2, Decimal("20.00000000"), 1403, 1)
+        make_payment(user2, _D20, 1403, 1)
 
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.ACTIVE
-        assert loan.user in [user1, user2]
+        self.assertEqual(loan.state, LoanState.ACTIVE)
+        self.assertIn(loan.user, [user1, user2])
         # Both should be in random_pool
-        assert len(loan.log["random_pool"]) == 2
+        self.assertEqual(len(loan.log["random_pool"]), 2)
+
+    def test_finite_scores_logged_when_unlimited_user_wins(self):
+        """Finite scores beaten by an unlimited user are logged as skipped."""
+        unlimited = make_user(
+            "skipunlimited", balance=_D300, loan_request_amount=_D100
+        )
+        finite = make_user("skipfinite", balance=_D300, loan_request_amount=_D100)
+        make_payments_bulk(unlimited, _D20, 1403, [1])
+        make_payments_bulk(finite, _D20, 1403, [1])
+
+        # Eligible users have no active loan, which makes their score
+        # unlimited, so give one of them a finite denominator directly
+        with patch(
+            "apps.loans.algorithm.score_denominator",
+            lambda user, inputs: None if user.id == unlimited.id else 1.0,
+        ):
+            loan = run_loan_assignment(1403, 1)
+
+        self.assertEqual(loan.user_id, unlimited.id)
+        self.assertEqual(loan.log["random_pool"], [unlimited.id])
+        entries = {e["user_id"]: e for e in loan.log["participated"]}
+        self.assertEqual(entries[unlimited.id]["point"], "unlimited")
+        self.assertNotIn("skipped", entries[unlimited.id])
+        self.assertEqual(entries[finite.id]["point"], "0")
+        self.assertIs(entries[finite.id]["skipped"], True)
+
+    def test_same_seed_replays_winner(self):
+        """The same seed selects the same winner from a tied pool."""
+        for i in range(5):
+            user = make_user(
+                f"seeded{i}",
+                balance=_D300,
+                loan_request_amount=_D100,
+            )
+            make_payment(user, _D20, 1403, 1)
+
+        loan = run_loan_assignment(1403, 1, seed=42)
+        winner_id = loan.log["selected"]
+        loan.delete()
+
+        replayed = run_loan_assignment(1403, 1, seed=42)
+
+        self.assertEqual(replayed.log["selected"], winner_id)
+        self.assertEqual(replayed.log["random_pool"], loan.log["random_pool"])
+        self.assertEqual(replayed.log["seed"], 42)
+
+    def test_unseeded_draw_records_replayable_seed(self):
+        """Without a seed, the drawn seed is logged and replays the winner."""
+        for i in range(5):
+            user = make_user(
+                f"unseeded{i}",
+                balance=_D300,
+                loan_request_amount=_D100,
+            )
+            make_payment(user, _D20, 1403, 1)
+
+        loan = run_loan_assignment(1403, 1)
+        seed = loan.log["seed"]
+        self.assertIsInstance(seed, int)
+        loan.delete()
+
+        replayed = run_loan_assignment(1403, 1, seed=seed)
+
+        self.assertEqual(replayed.log["selected"], loan.log["selected"])
 
     def test_user_with_higher_score_wins(self):
         """
@@ -661,14 +781,13 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
             loan_request_amount=Decimal("50.00000000"),
         )
         # 10 membership payments
-        for month in range(1, 11):
-            make_payment(user1, Decimal("20.00000000"), 1402, month)
+        make_payments_bulk(user1, _D20, 1402, range(1, 11))
         # Active loan
-        loan1 = make_active_loan(user1, Decimal("200.00000000"), 1401, 1)
+        loan1 = make_active_loan(user1, _D200, 1401, 1)
         # Loan payment
-        make_loan_payment(user1, loan1, Decimal("20.00000000"), 1402, 11)
+        make_loan_payment(user1, loan1, _D20, 1402, 11)
         # Payment for current month
-        make_payment(user1, Decimal("20.00000000"), 1403, 1)
+        make_payment(user1, _D20, 1403, 1)
 
         # User 2: minimal history → lower score
         user2 = make_user(
@@ -676,9 +795,9 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
             balance=Decimal("10.00000000"),  # low balance → low log(balance)
             loan_request_amount=Decimal("50.00000000"),
         )
-        make_payment(user2, Decimal("20.00000000"), 1403, 1)
-        loan2 = make_active_loan(user2, Decimal("200.00000000"), 1401, 2)
-        make_loan_payment(user2, loan2, Decimal("20.00000000"), 1403, 2)
+        make_payment(user2, _D20, 1403, 1)
+        loan2 = make_active_loan(user2, _D200, 1401, 2)
+        make_loan_payment(user2, loan2, _D20, 1403, 2)
         # Note: user2 has a loan payment in 1403/2 but we need 1403/1 payment
         # The payment for 1403/1 was already created above
 
@@ -691,55 +810,55 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
             # user1 has unlimited score → should win
             pass
         elif score1 is not None and score2 is not None:
-            assert score1 > score2
+            self.assertGreater(score1, score2)
 
     def test_zero_loan_request_user_excluded_from_multiple(self):
         """User with loan_request_amount=0 is excluded even with other eligible users."""
         user_opted_out = make_user(
             "optedout",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("0"),
+            balance=_D300,
+            loan_request_amount=_D0,
         )
-        make_payment(user_opted_out, Decimal("20.00000000"), 1403, 1)
+        make_payment(user_opted_out, _D20, 1403, 1)
 
         user_eligible = make_user(
             "wantsit",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user_eligible, Decimal("20.00000000"), 1403, 1)
+        make_payment(user_eligible, _D20, 1403, 1)
 
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.ACTIVE
-        assert loan.user == user_eligible
+        self.assertEqual(loan.state, LoanState.ACTIVE)
+        self.assertEqual(loan.user, user_eligible)
         not_participated_ids = [
             e["user_id"] for e in loan.log["not_participated"]
         ]
-        assert user_opted_out.id in not_participated_ids
+        self.assertIn(user_opted_out.id, not_participated_ids)
 
     def test_inactive_users_excluded(self):
         """Inactive users (is_active=False) are not considered in assignment."""
         active_user = make_user(
             "active",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
             is_active=True,
         )
-        make_payment(active_user, Decimal("20.00000000"), 1403, 1)
+        make_payment(active_user, _D20, 1403, 1)
 
         inactive_user = make_user(
             "inactive",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
             is_active=False,
         )
         # Inactive user has NOT paid (and shouldn't be required to)
 
         loan = run_loan_assignment(1403, 1)
 
-        assert loan.state == LoanState.ACTIVE
-        assert loan.user == active_user
+        self.assertEqual(loan.state, LoanState.ACTIVE)
+        self.assertEqual(loan.user, active_user)
 
     def test_main_user_bypasses_balance_check(self):
         """
@@ -748,10 +867,10 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
         main_user = make_user(
             "mainbig",
             balance=Decimal("10.00000000"),
-            loan_request_amount=Decimal("500.00000000"),  # > balance
+            loan_request_amount=_D500,  # > balance
             is_main=True,
         )
-        make_payment(main_user, Decimal("20.00000000"), 1403, 1)
+        make_payment(main_user, _D20, 1403, 1)
 
         # saghat_balance = 10, but main_user requests 500 → not fundable
         # However, main_user should be in participated (not excluded for balance check)
@@ -759,39 +878,52 @@ class TestRunLoanAssignmentMultipleUsers(TestCase):
 
         # main_user is eligible (bypasses balance check) but can't be funded
         # because saghat_balance < loan_request_amount
-        assert loan.state == LoanState.NO_ONE
+        self.assertEqual(loan.state, LoanState.NO_ONE)
         participated_ids = [e["user_id"] for e in loan.log["participated"]]
-        assert main_user.id in participated_ids
+        self.assertIn(main_user.id, participated_ids)
 
     def test_loan_assignment_creates_loan_record_in_db(self):
         """run_loan_assignment creates a Loan record in the database."""
         user = make_user(
             "dbtest",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
+        make_payment(user, _D20, 1403, 1)
 
-        assert Loan.objects.count() == 0
+        self.assertEqual(Loan.objects.count(), 0)
 
         loan = run_loan_assignment(1403, 1)
 
-        assert Loan.objects.count() == 1
-        assert Loan.objects.get(pk=loan.pk) is not None
+        self.assertEqual(Loan.objects.count(), 1)
+        self.assertIsNotNone(Loan.objects.get(pk=loan.pk))
+
+
+class TestRunLoanAssignmentDuplicateMonth(TransactionTestCase):
+    """
+    run_loan_assignment() for an already assigned month.
+
+    Runs without TestCase's wrapping transaction so the IntegrityError unwinds
+    run_loan_assignment()'s own atomic block exactly as it does in production.
+    """
+
+    def setUp(self):
+        get_or_create_config()
 
     def test_duplicate_month_raises_integrity_error(self):
         """Running assignment twice for the same month raises an error."""
-        from django.db import IntegrityError
-
         user = make_user(
             "dupmonth",
-            balance=Decimal("300.00000000"),
-            loan_request_amount=Decimal("100.00000000"),
+            balance=_D300,
+            loan_request_amount=_D100,
         )
-        make_payment(user, Decimal("20.00000000"), 1403, 1)
+        make_payment(user, _D20, 1403, 1)
 
         run_loan_assignment(1403, 1)
 
         # Second run for same month should fail due to unique_together constraint
         with self.assertRaises(IntegrityError):
             run_loan_assignment(1403, 1)
+
+        # The first assignment is untouched by the failed one
+        self.assertEqual(Loan.objects.count(), 1)
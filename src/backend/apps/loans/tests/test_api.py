@@ -10,29 +10,38 @@ Tests cover:
 
 import uuid
 from decimal import Decimal
-from unittest.mock import patch, MagicMock
+from functools import lru_cache
+from unittest.mock import patch
 
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from ninja.testing import TestClient
 
 from apps.loans.api import router
 from apps.loans.models import Loan, LoanState
+from apps.payments.models import LoanPayment, Payment
+from apps.users.models import User
 from apps.common.auth import create_access_token
+from apps.common.jalali import JalaliDate
 
 
 client = TestClient(router)
 
 
+@lru_cache(maxsize=None)
+def _token_for(user_id: int) -> str:
+    """Sign one access token per user id for the whole test run."""
+    return create_access_token(user_id)
+
+
 def auth_headers(user) -> dict:
     """Return Authorization headers for the given user."""
-    token = create_access_token(user.id)
-    return {"Authorization": f"Bearer {token}"}
+    return {"Authorization": f"Bearer {_token_for(user.id)}"}
 
 
 def make_main_user(username="mainadmin", password="adminpass123"):
-    from apps.users.models import User
-
     return User.objects.create_user(
         username=username,
         password=password,
@@ -44,8 +53,6 @@ def make_main_user(username="mainadmin", password="adminpass123"):
 
 
 def make_regular_user(username="regularuser", password="regularpass123"):
-    from apps.users.models import User
-
     return User.objects.create_user(
         username=username,
         password=password,
@@ -78,26 +85,25 @@ def make_loan(
 class TestStartLoanAssignment(TestCase):
     """Tests for POST /start"""
 
-    def setUp(self):
-        self.main_user = make_main_user("startadmin")
-        self.regular_user = make_regular_user("startregular")
+    @classmethod
+    def setUpTestData(cls):
+        cls.main_user = make_main_user("startadmin")
+        cls.regular_user = make_regular_user("startregular")
 
     @patch("apps.loans.api.run_loan_assignment")
     @patch("apps.loans.api.get_current_jalali")
     def test_start_loan_assignment_success(self, mock_jalali, mock_run):
         """Any authenticated user can trigger loan assignment."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 6
-        mock_jalali.return_value = mock_jalali_obj
+        mock_jalali.return_value = JalaliDate(year=1403, month=6)
 
-        loan = make_loan(
+        # The loan is created by the (mocked) assignment, after the view's
+        # "already done" check
+        mock_run.side_effect = lambda *args, **kwargs: make_loan(
             user=self.regular_user,
             state=LoanState.ACTIVE,
             year=1403,
             month=6,
         )
-        mock_run.return_value = loan
 
         response = client.post(
             "/start",
@@ -115,19 +121,15 @@ class TestStartLoanAssignment(TestCase):
         self, mock_jalali, mock_run
     ):
         """Returns 201 with no_one state when no eligible user found."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 7
-        mock_jalali.return_value = mock_jalali_obj
+        mock_jalali.return_value = JalaliDate(year=1403, month=7)
 
-        loan = make_loan(
+        mock_run.side_effect = lambda *args, **kwargs: make_loan(
             user=None,
             state=LoanState.NO_ONE,
             year=1403,
             month=7,
             amount=None,
         )
-        mock_run.return_value = loan
 
         response = client.post(
             "/start",
@@ -140,10 +142,7 @@ class TestStartLoanAssignment(TestCase):
     @patch("apps.loans.api.get_current_jalali")
     def test_start_loan_assignment_already_done(self, mock_jalali):
         """Returns 409 if loan assignment already done for this month."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 8
-        mock_jalali.return_value = mock_jalali_obj
+        mock_jalali.return_value = JalaliDate(year=1403, month=8)
 
         # Pre-create a loan for this month
         make_loan(
@@ -162,10 +161,7 @@ class TestStartLoanAssignment(TestCase):
     @patch("apps.loans.api.get_current_jalali")
     def test_start_loan_assignment_value_error(self, mock_jalali, mock_run):
         """Returns 400 if run_loan_assignment raises ValueError."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 9
-        mock_jalali.return_value = mock_jalali_obj
+        mock_jalali.return_value = JalaliDate(year=1403, month=9)
 
         mock_run.side_effect = ValueError("Not all users have paid this month")
 
@@ -178,6 +174,47 @@ class TestStartLoanAssignment(TestCase):
         self.assertIn("detail", data)
         self.assertIn("Not all users have paid", data["detail"])
 
+    @patch("apps.loans.api.run_loan_assignment")
+    @patch("apps.loans.api.get_current_jalali")
+    def test_start_loan_assignment_concurrent_duplicate(
+        self, mock_jalali, mock_run
+    ):
+        """Returns 409 if a concurrent call created the month's loan first."""
+        mock_jalali.return_value = JalaliDate(year=1403, month=10)
+
+        def assign_after_concurrent_call(*args, **kwargs):
+            # The other call's loan lands after the check; inserting this
+            # call's loan then hits the unique (jalali_year, jalali_month)
+            make_loan(year=1403, month=10)
+            return make_loan(year=1403, month=10)
+
+        mock_run.side_effect = assign_after_concurrent_call
+
+        response = client.post(
+            "/start",
+            headers=auth_headers(self.regular_user),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("already done", response.json()["detail"])
+        self.assertFalse(
+            Loan.objects.filter(jalali_year=1403, jalali_month=10).exists()
+        )
+
+    @patch("apps.loans.api.run_loan_assignment")
+    @patch("apps.loans.api.get_current_jalali")
+    def test_start_loan_assignment_other_integrity_error_propagates(
+        self, mock_jalali, mock_run
+    ):
+        """Integrity errors other than the month's unique loan are not a 409."""
+        mock_jalali.return_value = JalaliDate(year=1403, month=11)
+        mock_run.side_effect = IntegrityError("unexpected")
+
+        with self.assertRaises(IntegrityError):
+            client.post(
+                "/start",
+                headers=auth_headers(self.regular_user),
+            )
+
     def test_start_loan_assignment_no_auth(self):
         response = client.post("/start")
         self.assertEqual(response.status_code, 401)
@@ -193,27 +230,28 @@ class TestStartLoanAssignment(TestCase):
 class TestGetAllLoanHistory(TestCase):
     """Tests for GET /history"""
 
-    def setUp(self):
-        self.main_user = make_main_user("historyadmin")
-        self.regular_user = make_regular_user("historyregular")
+    @classmethod
+    def setUpTestData(cls):
+        cls.main_user = make_main_user("historyadmin")
+        cls.regular_user = make_regular_user("historyregular")
 
         # Create some loans
-        self.loan1 = make_loan(
-            user=self.regular_user,
+        cls.loan1 = make_loan(
+            user=cls.regular_user,
             state=LoanState.ACTIVE,
             year=1402,
             month=1,
             amount=Decimal("100.00"),
         )
-        self.loan2 = make_loan(
-            user=self.regular_user,
+        cls.loan2 = make_loan(
+            user=cls.regular_user,
             state=LoanState.NO_ONE,
             year=1402,
             month=2,
             amount=None,
         )
-        self.loan3 = make_loan(
-            user=self.regular_user,
+        cls.loan3 = make_loan(
+            user=cls.regular_user,
             state=LoanState.ACTIVE,
             year=1403,
             month=1,
@@ -252,6 +290,19 @@ class TestGetAllLoanHistory(TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["jalali_year"], 1403)
 
+    def test_get_all_loan_history_year_filter_is_integer_range(self):
+        """Year filters compare the integer column directly, so they stay indexable."""
+        headers = auth_headers(self.main_user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/history?jalali_year_gt=1402", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        loan_sql = next(
+            q["sql"] for q in ctx.captured_queries if 'FROM "loans"' in q["sql"]
+        )
+        self.assertIn('"loans"."jalali_year" > 1402', loan_sql)
+        self.assertNotIn("EXTRACT", loan_sql.upper())
+
     def test_get_all_loan_history_filter_year_lt(self):
         response = client.get(
             "/history?jalali_year_lt=1403",
@@ -275,6 +326,36 @@ class TestGetAllLoanHistory(TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["jalali_month"], 2)
 
+    def test_get_all_loan_history_keyset_pagination(self):
+        first_page = client.get(
+            "/history?limit=2",
+            headers=auth_headers(self.main_user),
+        ).json()
+        self.assertEqual(
+            [loan["id"] for loan in first_page],
+            [str(self.loan3.id), str(self.loan2.id)],
+        )
+
+        last = first_page[-1]
+        response = client.get(
+            f"/history?limit=2&before_year={last['jalali_year']}"
+            f"&before_month={last['jalali_month']}",
+            headers=auth_headers(self.main_user),
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([loan["id"] for loan in data], [str(self.loan1.id)])
+
+    def test_get_all_loan_history_rejects_invalid_cursor(self):
+        """before_month needs before_year and must be a valid month."""
+        for query in ("before_month=5", "before_year=1403&before_month=13"):
+            with self.subTest(query=query):
+                response = client.get(
+                    f"/history?{query}",
+                    headers=auth_headers(self.main_user),
+                )
+                self.assertEqual(response.status_code, 422)
+
     def test_get_all_loan_history_response_fields(self):
         response = client.get(
             "/history",
@@ -301,32 +382,62 @@ class TestGetAllLoanHistory(TestCase):
         for field in expected_fields:
             self.assertIn(field, loan_data)
 
+    def test_get_all_loan_history_query_count_is_constant(self):
+        """Auth, loans and prefetched payments: no per-loan queries."""
+        headers = auth_headers(self.main_user)
+        with self.assertNumQueries(3):
+            response = client.get("/history", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_all_loan_history_query_count_ignores_loan_count(self):
+        """More loans, borrowers and payments do not add queries."""
+        for month in range(2, 8):
+            borrower = make_regular_user(f"historyborrower{month}")
+            loan = make_loan(user=borrower, year=1403, month=month)
+            payment = Payment.objects.create(
+                user=borrower,
+                amount=Decimal("10.00"),
+                jalali_year=1403,
+                jalali_month=month,
+                bitpin_payment_id=f"bp-history-{month}",
+            )
+            LoanPayment.objects.create(
+                payment=payment, loan=loan, amount=Decimal("10.00")
+            )
+
+        headers = auth_headers(self.main_user)
+        with self.assertNumQueries(3):
+            response = client.get("/history", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 9)
+
 
 class TestGetMyLoanHistory(TestCase):
     """Tests for GET /my-history"""
 
-    def setUp(self):
-        self.user1 = make_regular_user("myhistoryuser1")
-        self.user2 = make_regular_user("myhistoryuser2")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = make_regular_user("myhistoryuser1")
+        cls.user2 = make_regular_user("myhistoryuser2")
 
         # Create loans for user1
-        self.loan1 = make_loan(
-            user=self.user1,
+        cls.loan1 = make_loan(
+            user=cls.user1,
             state=LoanState.ACTIVE,
             year=1402,
             month=3,
             amount=Decimal("100.00"),
         )
-        self.loan2 = make_loan(
-            user=self.user1,
+        cls.loan2 = make_loan(
+            user=cls.user1,
             state=LoanState.ACTIVE,
             year=1402,
             month=4,
             amount=Decimal("150.00"),
         )
         # Create a loan for user2
-        self.loan3 = make_loan(
-            user=self.user2,
+        cls.loan3 = make_loan(
+            user=cls.user2,
             state=LoanState.ACTIVE,
             year=1402,
             month=5,
@@ -372,20 +483,21 @@ class TestGetMyLoanHistory(TestCase):
 class TestGetLoanDetail(TestCase):
     """Tests for GET /{loan_id}"""
 
-    def setUp(self):
-        self.main_user = make_main_user("detailadmin")
-        self.user1 = make_regular_user("detailuser1")
-        self.user2 = make_regular_user("detailuser2")
+    @classmethod
+    def setUpTestData(cls):
+        cls.main_user = make_main_user("detailadmin")
+        cls.user1 = make_regular_user("detailuser1")
+        cls.user2 = make_regular_user("detailuser2")
 
-        self.loan1 = make_loan(
-            user=self.user1,
+        cls.loan1 = make_loan(
+            user=cls.user1,
             state=LoanState.ACTIVE,
             year=1402,
             month=6,
             amount=Decimal("100.00"),
         )
-        self.loan2 = make_loan(
-            user=self.user2,
+        cls.loan2 = make_loan(
+            user=cls.user2,
             state=LoanState.ACTIVE,
             year=1402,
             month=7,
@@ -436,7 +548,7 @@ class TestGetLoanDetail(TestCase):
             "/not-a-valid-uuid",
             headers=auth_headers(self.user1),
         )
-        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.status_code, 422)
         data = response.json()
         self.assertIn("detail", data)
 
@@ -445,10 +557,10 @@ class TestGetLoanDetail(TestCase):
         self.assertEqual(response.status_code, 401)
 
     def test_get_loan_detail_response_fields(self):
-        response = client.get(
-            f"/{self.loan1.id}",
-            headers=auth_headers(self.user1),
-        )
+        headers = auth_headers(self.user1)
+        # Auth, the loan with its SQL-summed total_paid, prefetched payments.
+        with self.assertNumQueries(3):
+            response = client.get(f"/{self.loan1.id}", headers=headers)
         self.assertEqual(response.status_code, 200)
         data = response.json()
         expected_fields = [
@@ -467,3 +579,27 @@ class TestGetLoanDetail(TestCase):
         ]
         for field in expected_fields:
             self.assertIn(field, data)
+
+    def test_get_loan_detail_payments_ordered_by_month(self):
+        for month in (3, 1, 2):
+            payment = Payment.objects.create(
+                user=self.user1,
+                amount=Decimal("10.00"),
+                jalali_year=1403,
+                jalali_month=month,
+                bitpin_payment_id=f"bp-detail-{month}",
+            )
+            LoanPayment.objects.create(
+                payment=payment, loan=self.loan1, amount=Decimal("10.00")
+            )
+
+        response = client.get(
+            f"/{self.loan1.id}",
+            headers=auth_headers(self.user1),
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        months = [p["jalali_month"] for p in data["payments"]]
+        self.assertEqual(months, [1, 2, 3])
+        self.assertEqual(Decimal(data["total_paid"]), Decimal("30.00"))
+        self.assertEqual(Decimal(data["remaining_balance"]), Decimal("70.00"))
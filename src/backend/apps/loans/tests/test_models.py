@@ -12,9 +12,11 @@ Tests cover:
 import uuid
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 
 from apps.loans.models import Loan, LoanState
+from apps.payments.models import LoanPayment, Payment
 from apps.users.models import User
 
 
@@ -44,8 +46,9 @@ class TestLoanStateChoices(TestCase):
 class TestLoanCreation(TestCase):
     """Tests for Loan model creation."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="borrower",
             password="pass123",
             balance=Decimal("300.00000000"),
@@ -102,8 +105,6 @@ class TestLoanCreation(TestCase):
 
     def test_loan_unique_together_jalali_year_month(self):
         """Two loans cannot share the same jalali_year and jalali_month."""
-        from django.db import IntegrityError
-
         Loan.objects.create(jalali_year=1403, jalali_month=4)
 
         with self.assertRaises(IntegrityError):
@@ -160,14 +161,15 @@ class TestLoanCreation(TestCase):
 class TestLoanTotalPaid(TestCase):
     """Tests for the total_paid property."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="payer",
             password="pass123",
             balance=Decimal("500.00000000"),
         )
-        self.loan = Loan.objects.create(
-            user=self.user,
+        cls.loan = Loan.objects.create(
+            user=cls.user,
             amount=Decimal("200.00000000"),
             state=LoanState.ACTIVE,
             jalali_year=1403,
@@ -177,8 +179,6 @@ class TestLoanTotalPaid(TestCase):
 
     def _make_loan_payment(self, amount: Decimal, year: int, month: int):
         """Helper to create a LoanPayment linked to self.loan."""
-        from apps.payments.models import LoanPayment, Payment
-
         payment = Payment.objects.create(
             user=self.user,
             amount=amount,
@@ -193,6 +193,28 @@ class TestLoanTotalPaid(TestCase):
         )
         return payment
 
+    def _make_loan_payments_bulk(self, entries: list[tuple[Decimal, int, int]]):
+        """Helper to create several LoanPayments for self.loan in two INSERTs."""
+        payments = Payment.objects.bulk_create(
+            [
+                Payment(
+                    user=self.user,
+                    amount=amount,
+                    jalali_year=year,
+                    jalali_month=month,
+                    bitpin_payment_id=f"bp_{year}_{month}",
+                )
+                for amount, year, month in entries
+            ]
+        )
+        LoanPayment.objects.bulk_create(
+            [
+                LoanPayment(payment=p, loan=self.loan, amount=p.amount)
+                for p in payments
+            ]
+        )
+        return payments
+
     def test_total_paid_zero_when_no_payments(self):
         """total_paid is Decimal('0') when no loan payments exist."""
         assert self.loan.total_paid == Decimal("0")
@@ -205,18 +227,49 @@ class TestLoanTotalPaid(TestCase):
 
     def test_total_paid_multiple_payments(self):
         """total_paid sums all loan payments."""
-        self._make_loan_payment(Decimal("50.00000000"), 1403, 2)
-        self._make_loan_payment(Decimal("30.00000000"), 1403, 3)
-        self._make_loan_payment(Decimal("20.00000000"), 1403, 4)
+        self._make_loan_payments_bulk(
+            [
+                (Decimal("50.00000000"), 1403, 2),
+                (Decimal("30.00000000"), 1403, 3),
+                (Decimal("20.00000000"), 1403, 4),
+            ]
+        )
 
         assert self.loan.total_paid == Decimal("100.00000000")
 
+    def test_total_paid_is_cached_until_invalidated(self):
+        """total_paid is computed once per instance until invalidate_totals()."""
+        assert self.loan.total_paid == Decimal("0")
+
+        self._make_loan_payment(Decimal("50.00000000"), 1403, 2)
+        with self.assertNumQueries(0):
+            assert self.loan.total_paid == Decimal("0")
+
+        self.loan.invalidate_totals()
+        assert self.loan.total_paid == Decimal("50.00000000")
+
+    def test_total_paid_uses_with_totals_annotation(self):
+        """Loans from with_totals() report total_paid without another query."""
+        self._make_loan_payments_bulk(
+            [
+                (Decimal("50.00000000"), 1403, 2),
+                (Decimal("30.00000000"), 1403, 3),
+            ]
+        )
+
+        loan = Loan.objects.with_totals().get(pk=self.loan.pk)
+
+        with self.assertNumQueries(0):
+            assert loan.total_paid == Decimal("80.00000000")
+            assert loan.remaining_balance == Decimal("120.00000000")
+
 
 class TestLoanRemainingBalance(TestCase):
     """Tests for the remaining_balance property."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="debtor",
             password="pass123",
             balance=Decimal("500.00000000"),
@@ -246,8 +299,6 @@ class TestLoanRemainingBalance(TestCase):
 
     def test_remaining_balance_decreases_with_payments(self):
         """remaining_balance decreases as payments are made."""
-        from apps.payments.models import LoanPayment, Payment
-
         loan = Loan.objects.create(
             user=self.user,
             amount=Decimal("200.00000000"),
@@ -274,8 +325,9 @@ class TestLoanRemainingBalance(TestCase):
 class TestLoanIsSettled(TestCase):
     """Tests for the is_settled property."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="settler",
             password="pass123",
             balance=Decimal("500.00000000"),
@@ -295,8 +347,6 @@ class TestLoanIsSettled(TestCase):
 
     def test_is_settled_false_when_partially_paid(self):
         """is_settled is False when loan is only partially paid."""
-        from apps.payments.models import LoanPayment, Payment
-
         loan = Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
@@ -321,8 +371,6 @@ class TestLoanIsSettled(TestCase):
 
     def test_is_settled_true_when_fully_paid(self):
         """is_settled is True when total_paid >= loan amount."""
-        from apps.payments.models import LoanPayment, Payment
-
         loan = Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
@@ -347,8 +395,6 @@ class TestLoanIsSettled(TestCase):
 
     def test_is_settled_true_when_overpaid(self):
         """is_settled is True when total_paid exceeds loan amount."""
-        from apps.payments.models import LoanPayment, Payment
-
         loan = Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
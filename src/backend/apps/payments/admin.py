@@ -39,6 +39,7 @@ class PaymentAdmin(admin.ModelAdmin):
         "id",
         "created_at",
     )
+    list_select_related = ("user",)
     ordering = ("-created_at",)
 
     def has_add_permission(self, request):
@@ -67,6 +68,7 @@ class MembershipFeePaymentAdmin(admin.ModelAdmin):
         "payment__bitpin_payment_id",
     )
     readonly_fields = ("id",)
+    list_select_related = ("payment",)
     ordering = ("-payment__created_at",)
 
     def has_add_permission(self, request):
@@ -97,6 +99,7 @@ class LoanPaymentAdmin(admin.ModelAdmin):
         "payment__bitpin_payment_id",
     )
     readonly_fields = ("id",)
+    list_select_related = ("payment", "loan")
     ordering = ("-payment__created_at",)
 
     def has_add_permission(self, request):
@@ -1,11 +1,13 @@
 from typing import Any
 from django.http import HttpRequest
-from django.db import transaction
-from ninja import Router
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Q, QuerySet, Subquery
+from ninja import Query, Router
 
 from saghat.settings.base import settings as app_settings
-from apps.common.auth import jwt_auth
-from apps.common.jalali import get_current_jalali
+from apps.common.auth import JWTAuth, jwt_auth
+from apps.common.db import violated_constraint
+from apps.common.jalali import JalaliDate, get_current_jalali
 from apps.loans.models import Loan, LoanState
 from apps.payments.bitpin import get_bitpin_client
 from apps.payments.models import (
@@ -19,6 +21,7 @@ from apps.payments.schemas import (
     ErrorResponse,
     LoanPaymentResponse,
     MembershipFeePaymentResponse,
+    MyPaymentsFilters,
     PaymentRequest,
     PaymentResponse,
 )
@@ -27,6 +30,72 @@ from apps.users.models import User
 router = Router(tags=["payments"])
 
 
+class PayerAuth(JWTAuth):
+    """
+    jwt_auth that also loads the user's active loan in the same query.
+
+    Adds active_loan_id and active_loan_min_payment (None without an active
+    loan), so pay() needs no separate loan lookup.
+    """
+
+    def get_queryset(self) -> QuerySet:
+        active_loan = Loan.objects.filter(
+            user=OuterRef("pk"), state=LoanState.ACTIVE
+        )
+        return (
+            super()
+            .get_queryset()
+            .annotate(
+                active_loan_id=Subquery(active_loan.values("id")[:1]),
+                active_loan_min_payment=Subquery(
+                    active_loan.values("min_amount_for_each_payment")[:1]
+                ),
+            )
+        )
+
+
+payer_auth = PayerAuth()
+
+# Django-generated names of the unique constraints on payments (prefixes,
+# without the hash suffix) that pay() reports as a 409
+_MONTH_UNIQUE_PREFIX = "payments_user_id_jalali_year_jalali_month_"
+_BITPIN_UNIQUE_PREFIX = "payments_bitpin_payment_id_"
+
+
+def _bitpin_used(bitpin_payment_id: str) -> ErrorResponse:
+    return ErrorResponse(
+        detail=f"Bitpin payment {bitpin_payment_id} has already been used"
+    )
+
+
+def _month_paid(jalali: JalaliDate) -> ErrorResponse:
+    return ErrorResponse(
+        detail=f"Payment already submitted for {jalali.year}/{jalali.month}"
+    )
+
+
+def _payment_conflict(
+    user: User, jalali: JalaliDate, bitpin_payment_id: str
+) -> ErrorResponse | None:
+    """
+    The 409 error for a payment clashing with an existing one, if any.
+
+    One query over both unique indexes: the user's payment for the month and
+    any payment that already claimed the Bitpin payment.
+    """
+    existing_ids = list(
+        Payment.objects.filter(
+            Q(user=user, jalali_year=jalali.year, jalali_month=jalali.month)
+            | Q(bitpin_payment_id=bitpin_payment_id)
+        ).values_list("bitpin_payment_id", flat=True)
+    )
+    if bitpin_payment_id in existing_ids:
+        return _bitpin_used(bitpin_payment_id)
+    if existing_ids:
+        return _month_paid(jalali)
+    return None
+
+
 @router.post(
     "/pay",
     response={
@@ -35,7 +104,7 @@ router = Router(tags=["payments"])
         401: ErrorResponse,
         409: ErrorResponse,
     },
-    auth=jwt_auth,
+    auth=payer_auth,
 )
 def pay(request: HttpRequest, payload: PaymentRequest) -> tuple[int, Any]:
     """
@@ -49,21 +118,19 @@ def pay(request: HttpRequest, payload: PaymentRequest) -> tuple[int, Any]:
     5. Creates Payment, MembershipFeePayment, and optionally LoanPayment records
     6. Updates user.balance += membership_fee
 
-    A user can only submit one payment per Jalali month.
+    A user can only submit one payment per Jalali month, and each Bitpin
+    payment can only be used once (409 otherwise).
     """
     user: User = request.auth  # type: ignore[assignment]
-    config = Config.get_config()
     jalali = get_current_jalali()
 
-    # Check duplicate payment for this month
-    if Payment.objects.filter(
-        user=user,
-        jalali_year=jalali.year,
-        jalali_month=jalali.month,
-    ).exists():
-        return 409, ErrorResponse(
-            detail=f"Payment already submitted for {jalali.year}/{jalali.month}"
-        )
+    # Reject a second payment for the month or a reused Bitpin payment before
+    # validating it or calling Bitpin
+    conflict = _payment_conflict(user, jalali, payload.bitpin_payment_id)
+    if conflict is not None:
+        return 409, conflict
+
+    config = Config.get_config()
 
     # Validate membership fee
     if payload.membership_fee < config.min_membership_fee:
@@ -74,24 +141,21 @@ def pay(request: HttpRequest, payload: PaymentRequest) -> tuple[int, Any]:
             )
         )
 
-    # Validate loan repayment
-    active_loan: Loan | None = None
-    try:
-        active_loan = user.loans.get(state=LoanState.ACTIVE)
-    except Loan.DoesNotExist:
-        active_loan = None
+    # Validate loan repayment (active loan columns are annotated by payer_auth)
+    active_loan_id = user.active_loan_id  # type: ignore[attr-defined]
+    min_loan_payment = user.active_loan_min_payment  # type: ignore[attr-defined]
 
-    if active_loan is not None:
+    if active_loan_id is not None:
         # User has active loan — loan payment is required
         if payload.loan is None:
             return 400, ErrorResponse(
                 detail="You have an active loan. Loan repayment amount is required."
             )
-        if payload.loan < active_loan.min_amount_for_each_payment:
+        if payload.loan < min_loan_payment:
             return 400, ErrorResponse(
                 detail=(
                     f"Loan payment {payload.loan} is less than minimum required "
-                    f"{active_loan.min_amount_for_each_payment}"
+                    f"{min_loan_payment}"
                 )
             )
     else:
@@ -101,10 +165,7 @@ def pay(request: HttpRequest, payload: PaymentRequest) -> tuple[int, Any]:
                 detail="You do not have an active loan. Loan payment must be null."
             )
 
-    # Calculate total amount to verify with Bitpin
-    total_amount = payload.membership_fee
-    if payload.loan is not None:
-        total_amount += payload.loan
+    total_amount = payload.total
 
     # Verify with Bitpin (skip if no API key configured — dev mode)
     if app_settings.BITPIN_API_KEY:
@@ -117,45 +178,59 @@ def pay(request: HttpRequest, payload: PaymentRequest) -> tuple[int, Any]:
                 detail=f"Bitpin payment verification failed: {reason}"
             )
 
-    # Create records atomically
-    with transaction.atomic():
-        # Update loan_request_amount on user if provided
-        if payload.loan_request_amount is not None:
-            user.loan_request_amount = payload.loan_request_amount
-
-        # Increase balance by membership fee
-        user.balance = user.balance + payload.membership_fee
-        user.save(update_fields=["balance", "loan_request_amount"])
-
-        # Create base Payment record
-        payment = Payment.objects.create(
-            user=user,
-            amount=total_amount,
-            jalali_year=jalali.year,
-            jalali_month=jalali.month,
-            bitpin_payment_id=payload.bitpin_payment_id,
-        )
-
-        # Create MembershipFeePayment
-        membership_fee_payment = MembershipFeePayment.objects.create(
-            payment=payment,
-            amount=payload.membership_fee,
-        )
+    # Create records atomically. A concurrent request that passed the check
+    # above as well is stopped by the unique (user, jalali_year, jalali_month)
+    # or bitpin_payment_id constraint; the whole block, including the balance
+    # update, is then rolled back and the caller gets 409. Any other integrity
+    # error is a bug and propagates.
+    try:
+        with transaction.atomic():
+            # Create base Payment record
+            payment = Payment.objects.create(
+                user=user,
+                amount=total_amount,
+                jalali_year=jalali.year,
+                jalali_month=jalali.month,
+                bitpin_payment_id=payload.bitpin_payment_id,
+            )
 
-        # Create LoanPayment if applicable
-        loan_payment_obj: LoanPayment | None = None
-        if active_loan is not None and payload.loan is not None:
-            loan_payment_obj = LoanPayment.objects.create(
+            # Create MembershipFeePayment
+            membership_fee_payment = MembershipFeePayment.objects.create(
                 payment=payment,
-                loan=active_loan,
-                amount=payload.loan,
+                amount=payload.membership_fee,
             )
 
+            # Create LoanPayment if applicable
+            loan_payment_obj: LoanPayment | None = None
+            if active_loan_id is not None and payload.loan is not None:
+                loan_payment_obj = LoanPayment.objects.create(
+                    payment=payment,
+                    loan_id=active_loan_id,
+                    amount=payload.loan,
+                )
+
+            # Increase balance by membership fee in the UPDATE itself, so
+            # concurrent writes to the balance are not lost, and update
+            # loan_request_amount if provided
+            user_updates: dict[str, Any] = {
+                "balance": F("balance") + payload.membership_fee
+            }
+            if payload.loan_request_amount is not None:
+                user_updates["loan_request_amount"] = payload.loan_request_amount
+            User.objects.filter(pk=user.pk).update(**user_updates)
+    except IntegrityError as exc:
+        constraint = violated_constraint(exc) or ""
+        if constraint.startswith(_BITPIN_UNIQUE_PREFIX):
+            return 409, _bitpin_used(payload.bitpin_payment_id)
+        if constraint.startswith(_MONTH_UNIQUE_PREFIX):
+            return 409, _month_paid(jalali)
+        raise
+
     # Build response
     loan_payment_response: LoanPaymentResponse | None = None
     if loan_payment_obj is not None:
         loan_payment_response = LoanPaymentResponse(
-            loan_id=active_loan.id,  # type: ignore[union-attr]
+            loan_id=loan_payment_obj.loan_id,
             amount=loan_payment_obj.amount,
         )
 
@@ -193,21 +268,51 @@ def get_config(request: HttpRequest) -> tuple[int, Any]:
     response={200: list[PaymentResponse], 401: ErrorResponse},
     auth=jwt_auth,
 )
-def list_my_payments(request: HttpRequest) -> tuple[int, Any]:
-    """List all payments made by the authenticated user."""
+def list_my_payments(
+    request: HttpRequest,
+    filters: MyPaymentsFilters = Query(...),
+) -> tuple[int, Any]:
+    """
+    List payments made by the authenticated user, newest first.
+
+    Query params (all optional; without them every payment is returned):
+    - before_year/before_month: Only payments strictly before this Jalali month
+    - limit: Maximum number of payments to return
+    """
     user: User = request.auth  # type: ignore[assignment]
     payments = (
         Payment.objects.filter(user=user)
-        .select_related("membership_fee", "loan_payment", "loan_payment__loan")
+        .select_related("membership_fee", "loan_payment")
+        .only(
+            "id",
+            "user",
+            "amount",
+            "jalali_year",
+            "jalali_month",
+            "bitpin_payment_id",
+            "membership_fee__amount",
+            "loan_payment__amount",
+            "loan_payment__loan",
+        )
         .order_by("-jalali_year", "-jalali_month")
     )
 
+    payments = filters.paginate(payments)
+
+    # select_related() caches the reverse one-to-one rows (None when missing);
+    # read that cache directly instead of letting a missing row raise
+    # RelatedObjectDoesNotExist for getattr() to swallow. Every value comes
+    # straight from the ORM with its declared type, so the schemas are built
+    # with model_construct() and skip per-row field validation.
+    membership_fee_rel = Payment.membership_fee.related
+    loan_payment_rel = Payment.loan_payment.related
+
     result = []
     for p in payments:
-        mf = getattr(p, "membership_fee", None)
-        lp = getattr(p, "loan_payment", None)
+        mf = membership_fee_rel.get_cached_value(p, default=None)
+        lp = loan_payment_rel.get_cached_value(p, default=None)
         result.append(
-            PaymentResponse(
+            PaymentResponse.model_construct(
                 id=p.id,
                 user_id=p.user_id,
                 amount=p.amount,
@@ -215,12 +320,16 @@ def list_my_payments(request: HttpRequest) -> tuple[int, Any]:
                 jalali_month=p.jalali_month,
                 bitpin_payment_id=p.bitpin_payment_id,
                 membership_fee=(
-                    MembershipFeePaymentResponse(amount=mf.amount)
+                    MembershipFeePaymentResponse.model_construct(
+                        amount=mf.amount
+                    )
                     if mf
                     else None
                 ),
                 loan_payment=(
-                    LoanPaymentResponse(loan_id=lp.loan_id, amount=lp.amount)
+                    LoanPaymentResponse.model_construct(
+                        loan_id=lp.loan_id, amount=lp.amount
+                    )
                     if lp
                     else None
                 ),
@@ -1,8 +1,13 @@
+import atexit
 import httpx
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 from typing import Optional
 from pydantic import BaseModel
 
+# Bitpin statuses that mean the payment went through.
+COMPLETED_STATUSES = frozenset({"completed", "paid", "confirmed", "done"})
+
 
 class BitpinPaymentInfo(BaseModel):
     """Parsed payment info from Bitpin API response."""
@@ -30,25 +35,44 @@ class BitpinClient:
         self.headers: dict[str, str] = {"Content-Type": "application/json"}
         if api_key:
             self.headers["Authorization"] = f"Token {api_key}"
+        # One pooled client per BitpinClient, so verifications reuse open
+        # connections instead of a new TCP + TLS handshake each time. The
+        # transport retries failed connection attempts (with backoff) only;
+        # HTTP error responses are returned as-is and never retried.
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=10.0,
+            transport=httpx.HTTPTransport(
+                retries=2,
+                limits=httpx.Limits(
+                    max_keepalive_connections=20, max_connections=50
+                ),
+            ),
+        )
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._client.close()
 
     def get_payment(self, payment_id: str) -> Optional[BitpinPaymentInfo]:
         """
         Fetch payment details from Bitpin.
-        Returns None if the payment is not found or request fails.
+        Returns None if the payment is not found, the request fails or the
+        response cannot be parsed; any other error propagates.
         """
-        url = f"{self.base_url}/v1/mch/payments/{payment_id}/"
         try:
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(url, headers=self.headers)
-                response.raise_for_status()
-                data = response.json()
-                return BitpinPaymentInfo(
-                    payment_id=str(data.get("id", payment_id)),
-                    amount=Decimal(str(data.get("amount", "0"))),
-                    status=data.get("status", "unknown"),
-                    currency=data.get("currency", "USDT"),
-                )
-        except (httpx.HTTPError, KeyError, ValueError, Exception):
+            response = self._client.get(f"/v1/mch/payments/{payment_id}/")
+            response.raise_for_status()
+            data = response.json()
+            return BitpinPaymentInfo(
+                payment_id=str(data.get("id", payment_id)),
+                amount=Decimal(str(data.get("amount", "0"))),
+                status=data.get("status", "unknown"),
+                currency=data.get("currency", "USDT"),
+            )
+        # ValueError covers malformed JSON and pydantic's ValidationError.
+        except (httpx.HTTPError, ValueError, InvalidOperation):
             return None
 
     def verify_payment_amount(
@@ -64,7 +88,7 @@ class BitpinClient:
         info = self.get_payment(payment_id)
         if info is None:
             return False, f"Payment {payment_id} not found in Bitpin"
-        if info.status not in ("completed", "paid", "confirmed", "done"):
+        if info.status.lower() not in COMPLETED_STATUSES:
             return (
                 False,
                 f"Payment {payment_id} status is '{info.status}', not completed",
@@ -77,11 +101,19 @@ class BitpinClient:
         return True, ""
 
 
+@lru_cache(maxsize=1)
 def get_bitpin_client() -> BitpinClient:
-    """Factory function to create a BitpinClient from app settings."""
+    """
+    Return the BitpinClient built from app settings.
+
+    Settings are fixed for the life of the process, so the client is built once
+    and shared.
+    """
     from saghat.settings.base import settings as app_settings
 
-    return BitpinClient(
+    client = BitpinClient(
         base_url=app_settings.BITPIN_API_BASE_URL,
         api_key=app_settings.BITPIN_API_KEY,
     )
+    atexit.register(client.close)
+    return client
@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="loanpayment",
+            index=models.Index(
+                fields=["loan"],
+                include=["amount"],
+                name="loanpayment_loan_amount_idx",
+            ),
+        ),
+        # The covering index above leads with loan, so the FK's own index
+        # is redundant
+        migrations.AlterField(
+            model_name="loanpayment",
+            name="loan",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="payments",
+                to="loans.loan",
+            ),
+        ),
+    ]
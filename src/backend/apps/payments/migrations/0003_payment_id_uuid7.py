@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+import apps.common.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_loanpayment_loan_amount_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="id",
+            field=models.UUIDField(
+                default=apps.common.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
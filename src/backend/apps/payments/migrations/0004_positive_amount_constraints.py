@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_payment_id_uuid7"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="membershipfeepayment",
+            constraint=models.CheckConstraint(
+                condition=models.Q(amount__gt=0),
+                name="membershipfeepayment_amount_positive",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="loanpayment",
+            constraint=models.CheckConstraint(
+                condition=models.Q(amount__gt=0),
+                name="loanpayment_amount_positive",
+            ),
+        ),
+    ]
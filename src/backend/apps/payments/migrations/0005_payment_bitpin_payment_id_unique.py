@@ -0,0 +1,46 @@
+"""
+Make Payment.bitpin_payment_id unique.
+
+Precondition: no two payments may share a bitpin_payment_id. Each such pair
+is a Bitpin payment claimed twice, so which record is wrong is a
+bookkeeping decision; the migration refuses to pick one and stops before
+altering the column, listing the duplicate ids to resolve by hand.
+"""
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_no_duplicate_bitpin_ids(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    duplicates = list(
+        Payment.objects.using(schema_editor.connection.alias)
+        .values("bitpin_payment_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("bitpin_payment_id", flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Cannot make payments.bitpin_payment_id unique: these Bitpin "
+            "payment ids are used by more than one payment: "
+            + ", ".join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_positive_amount_constraints"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_no_duplicate_bitpin_ids, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="bitpin_payment_id",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
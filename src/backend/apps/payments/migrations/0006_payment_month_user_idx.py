@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_payment_bitpin_payment_id_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["jalali_year", "jalali_month"],
+                include=["user"],
+                name="payment_month_user_idx",
+            ),
+        ),
+    ]
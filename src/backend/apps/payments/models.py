@@ -2,8 +2,11 @@ import uuid
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 
+from apps.common.ids import uuid7
+
 
 class Config(models.Model):
     """
@@ -22,12 +25,42 @@ class Config(models.Model):
     class Meta:
         db_table = "config"
 
+    CACHE_KEY = "payments:config"
+    # Upper bound on how long a stale row can be served if an invalidation
+    # is ever missed (e.g. a QuerySet.update() without refresh()).
+    CACHE_TIMEOUT = 300
+
     @classmethod
     def get_config(cls) -> "Config":
-        """Get or create the singleton config instance."""
-        config, _ = cls.objects.get_or_create(pk=1)
+        """
+        Get or create the singleton config instance.
+
+        The row is kept in the shared Django cache (Redis), so every worker
+        process sees the same value; saving or deleting a Config clears it
+        once the transaction commits (see apps.payments.signals).
+        """
+        config: Config | None = cache.get(cls.CACHE_KEY)
+        if config is None:
+            config, _ = cls.objects.get_or_create(pk=1)
+            cache.set(cls.CACHE_KEY, config, timeout=cls.CACHE_TIMEOUT)
         return config
 
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop the cached config so the next get_config() reads the database."""
+        cache.delete(cls.CACHE_KEY)
+
+    @classmethod
+    def refresh(cls) -> "Config":
+        """
+        Drop the cached config and load it again.
+
+        Needed after changes that bypass the save/delete signals, such as
+        QuerySet.update().
+        """
+        cls.clear_cache()
+        return cls.get_config()
+
     def __str__(self) -> str:
         return f"Config(min_fee={self.min_membership_fee})"
 
@@ -42,7 +75,7 @@ class Payment(models.Model):
     """
 
     id: uuid.UUID = models.UUIDField(
-        primary_key=True, default=uuid.uuid4, editable=False
+        primary_key=True, default=uuid7, editable=False
     )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -53,12 +86,25 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     jalali_year: int = models.PositiveIntegerField()
     jalali_month: int = models.PositiveIntegerField()
-    bitpin_payment_id: str = models.CharField(max_length=255)
+    # Unique so one Bitpin payment cannot be claimed for two monthly payments
+    bitpin_payment_id: str = models.CharField(max_length=255, unique=True)
 
     class Meta:
         db_table = "payments"
-        # Each user can only have one payment record per Jalali month
+        # Each user can only have one payment record per Jalali month. The
+        # unique index also serves list_my_payments' newest-first listing:
+        # Postgres scans it backwards, so no separate descending index.
         unique_together = [("user", "jalali_year", "jalali_month")]
+        indexes = [
+            # run_loan_assignment's "who has paid this month" check filters on
+            # the month alone, which the user-first unique index cannot serve;
+            # including user_id makes it an index-only scan.
+            models.Index(
+                fields=["jalali_year", "jalali_month"],
+                include=["user"],
+                name="payment_month_user_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Payment({self.user_id}, {self.jalali_year}/{self.jalali_month}, {self.amount})"
@@ -80,6 +126,12 @@ class MembershipFeePayment(models.Model):
 
     class Meta:
         db_table = "membership_fee_payments"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(amount__gt=0),
+                name="membershipfeepayment_amount_positive",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"MembershipFee({self.payment_id}, {self.amount})"
@@ -97,15 +149,33 @@ class LoanPayment(models.Model):
         on_delete=models.CASCADE,
         related_name="loan_payment",
     )
+    # No separate FK index: loanpayment_loan_amount_idx leads with loan and
+    # serves the same lookups.
     loan = models.ForeignKey(
         "loans.Loan",
         on_delete=models.PROTECT,
         related_name="payments",
+        db_index=False,
     )
     amount: Decimal = models.DecimalField(max_digits=20, decimal_places=8)
 
     class Meta:
         db_table = "loan_payments"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(amount__gt=0),
+                name="loanpayment_amount_positive",
+            ),
+        ]
+        indexes = [
+            # Covers Loan.total_paid's SUM(amount) per loan with an index-only
+            # scan instead of visiting every loan payment row.
+            models.Index(
+                fields=["loan"],
+                include=["amount"],
+                name="loanpayment_loan_amount_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"LoanPayment({self.payment_id}, loan={self.loan_id}, {self.amount})"
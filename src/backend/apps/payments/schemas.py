@@ -3,6 +3,8 @@ from typing import Optional
 import uuid
 from pydantic import BaseModel, Field
 
+from apps.common.schemas import JalaliMonthPage
+
 
 class PaymentRequest(BaseModel):
     """
@@ -17,10 +19,21 @@ class PaymentRequest(BaseModel):
     - bitpin_payment_id: The payment ID from Bitpin to verify the transaction.
     """
 
-    membership_fee: Decimal = Field(..., gt=0)
-    loan: Optional[Decimal] = Field(default=None, gt=0)
-    loan_request_amount: Optional[Decimal] = Field(default=None, ge=0)
-    bitpin_payment_id: str = Field(..., min_length=1)
+    membership_fee: Decimal = Field(..., gt=0, max_digits=20, decimal_places=8)
+    loan: Optional[Decimal] = Field(
+        default=None, gt=0, max_digits=20, decimal_places=8
+    )
+    loan_request_amount: Optional[Decimal] = Field(
+        default=None, ge=0, max_digits=20, decimal_places=8
+    )
+    bitpin_payment_id: str = Field(..., min_length=1, max_length=255)
+
+    model_config = {"extra": "forbid", "str_strip_whitespace": True}
+
+    @property
+    def total(self) -> Decimal:
+        """Total amount to verify with Bitpin: membership fee plus loan repayment."""
+        return self.membership_fee + (self.loan or Decimal("0"))
 
 
 class MembershipFeePaymentResponse(BaseModel):
@@ -49,6 +62,10 @@ class PaymentResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class MyPaymentsFilters(JalaliMonthPage):
+    """Keyset pagination for GET /my-payments (newest first)."""
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
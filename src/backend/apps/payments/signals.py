@@ -0,0 +1,18 @@
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.payments.models import Config
+
+
+@receiver([post_save, post_delete], sender=Config)
+def clear_config_cache(sender: type[Config], **kwargs: Any) -> None:
+    """
+    Invalidate the cached Config.get_config() result when Config changes.
+
+    Deferred to on_commit: clearing it right away would let a concurrent
+    get_config() re-cache the old row before the new one is committed.
+    """
+    transaction.on_commit(Config.clear_cache)
@@ -8,8 +8,11 @@ Tests cover:
 """
 
 from decimal import Decimal
+from functools import lru_cache
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
+from django.db import IntegrityError
 from django.test import TestCase
 
 from ninja.testing import TestClient
@@ -17,20 +20,25 @@ from ninja.testing import TestClient
 from apps.payments.api import router
 from apps.payments.models import Config, Payment, MembershipFeePayment
 from apps.loans.models import Loan, LoanState
+from apps.users.models import User
 from apps.common.auth import create_access_token
 
 
 client = TestClient(router)
 
 
+@lru_cache(maxsize=None)
+def _token_for(user_id: int) -> str:
+    """Sign one access token per user id for the whole test run."""
+    return create_access_token(user_id)
+
+
 def auth_headers(user) -> dict:
     """Return Authorization headers for the given user."""
-    token = create_access_token(user.id)
-    return {"Authorization": f"Bearer {token}"}
+    return {"Authorization": f"Bearer {_token_for(user.id)}"}
 
 
 def make_user(username="payuser", is_main=False, balance=Decimal("100.00")):
-    from apps.users.models import User
     return User.objects.create_user(
         username=username,
         password="paypass123",
@@ -60,9 +68,10 @@ def make_config(
 class TestGetConfig(TestCase):
     """Tests for GET /config"""
 
-    def setUp(self):
-        self.user = make_user("configuser")
-        self.config = make_config()
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("configuser")
+        cls.config = make_config()
 
     def test_get_config_authenticated(self):
         response = client.get(
@@ -101,47 +110,43 @@ class TestGetConfig(TestCase):
 class TestListMyPayments(TestCase):
     """Tests for GET /my-payments"""
 
-    def setUp(self):
-        self.user1 = make_user("mypayuser1")
-        self.user2 = make_user("mypayuser2")
-        self.config = make_config()
-
-        # Create payments for user1
-        self.payment1 = Payment.objects.create(
-            user=self.user1,
-            amount=Decimal("30.00"),
-            jalali_year=1402,
-            jalali_month=1,
-            bitpin_payment_id="bitpin-001",
-        )
-        MembershipFeePayment.objects.create(
-            payment=self.payment1,
-            amount=Decimal("30.00"),
-        )
-
-        self.payment2 = Payment.objects.create(
-            user=self.user1,
-            amount=Decimal("25.00"),
-            jalali_year=1402,
-            jalali_month=2,
-            bitpin_payment_id="bitpin-002",
-        )
-        MembershipFeePayment.objects.create(
-            payment=self.payment2,
-            amount=Decimal("25.00"),
-        )
-
-        # Create a payment for user2
-        self.payment3 = Payment.objects.create(
-            user=self.user2,
-            amount=Decimal("20.00"),
-            jalali_year=1402,
-            jalali_month=1,
-            bitpin_payment_id="bitpin-003",
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = make_user("mypayuser1")
+        cls.user2 = make_user("mypayuser2")
+        cls.config = make_config()
+
+        # Two payments for user1 and one for user2, each with its membership fee
+        cls.payment1, cls.payment2, cls.payment3 = Payment.objects.bulk_create(
+            [
+                Payment(
+                    user=cls.user1,
+                    amount=Decimal("30.00"),
+                    jalali_year=1402,
+                    jalali_month=1,
+                    bitpin_payment_id="bitpin-001",
+                ),
+                Payment(
+                    user=cls.user1,
+                    amount=Decimal("25.00"),
+                    jalali_year=1402,
+                    jalali_month=2,
+                    bitpin_payment_id="bitpin-002",
+                ),
+                Payment(
+                    user=cls.user2,
+                    amount=Decimal("20.00"),
+                    jalali_year=1402,
+                    jalali_month=1,
+                    bitpin_payment_id="bitpin-003",
+                ),
+            ]
         )
-        MembershipFeePayment.objects.create(
-            payment=self.payment3,
-            amount=Decimal("20.00"),
+        MembershipFeePayment.objects.bulk_create(
+            [
+                MembershipFeePayment(payment=p, amount=p.amount)
+                for p in (cls.payment1, cls.payment2, cls.payment3)
+            ]
         )
 
     def test_list_my_payments_returns_only_own_payments(self):
@@ -195,21 +200,60 @@ class TestListMyPayments(TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["user_id"], self.user2.id)
 
+    def test_list_my_payments_keyset_pagination(self):
+        first_page = client.get(
+            "/my-payments?limit=1",
+            headers=auth_headers(self.user1),
+        ).json()
+        self.assertEqual(len(first_page), 1)
+        self.assertEqual(first_page[0]["id"], str(self.payment2.id))
+
+        last = first_page[-1]
+        response = client.get(
+            f"/my-payments?limit=1&before_year={last['jalali_year']}"
+            f"&before_month={last['jalali_month']}",
+            headers=auth_headers(self.user1),
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["id"], str(self.payment1.id))
+
+
+    def test_list_my_payments_rejects_invalid_cursor(self):
+        """before_month needs before_year and must be a valid month."""
+        for query in ("before_month=5", "before_year=1403&before_month=13"):
+            with self.subTest(query=query):
+                response = client.get(
+                    f"/my-payments?{query}",
+                    headers=auth_headers(self.user1),
+                )
+                self.assertEqual(response.status_code, 422)
+
 
 class TestPay(TestCase):
     """Tests for POST /pay"""
 
-    def setUp(self):
-        self.user = make_user("paysubmituser", balance=Decimal("0.00"))
-        self.config = make_config(min_membership_fee=Decimal("20.00"))
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # pay() reads the current Jalali month from this namespace; tests set
+        # its year/month directly instead of patching per test.
+        cls.jalali = SimpleNamespace(year=1403, month=1)
+        patcher = patch(
+            "apps.payments.api.get_current_jalali", lambda: cls.jalali
+        )
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("paysubmituser", balance=Decimal("0.00"))
+        cls.config = make_config(min_membership_fee=Decimal("20.00"))
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_success_no_bitpin_key(self, mock_jalali):
+    def test_pay_success_no_bitpin_key(self):
         """Payment succeeds when BITPIN_API_KEY is not set (dev mode)."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 1
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 1
 
         response = client.post(
             "/pay",
@@ -229,13 +273,9 @@ class TestPay(TestCase):
         self.assertIsNotNone(data["membership_fee"])
         self.assertIsNone(data["loan_payment"])
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_updates_user_balance(self, mock_jalali):
+    def test_pay_updates_user_balance(self):
         """Payment increases user balance by membership_fee."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 2
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 2
 
         initial_balance = self.user.balance
         client.post(
@@ -249,13 +289,9 @@ class TestPay(TestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.balance, initial_balance + Decimal("30.00"))
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_duplicate_payment_same_month(self, mock_jalali):
+    def test_pay_duplicate_payment_same_month(self):
         """Returns 409 if user already paid for this month."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 3
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 3
 
         # First payment
         client.post(
@@ -280,13 +316,108 @@ class TestPay(TestCase):
         data = response.json()
         self.assertIn("detail", data)
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_membership_fee_below_minimum(self, mock_jalali):
+    def test_pay_reused_bitpin_payment_id(self):
+        """Returns 409 if the Bitpin payment was already used for another month."""
+        self.jalali.year, self.jalali.month = 1402, 11
+
+        client.post(
+            "/pay",
+            json={
+                "membership_fee": "25.00",
+                "bitpin_payment_id": "test-bitpin-reused",
+            },
+            headers=auth_headers(self.user),
+        )
+
+        self.jalali.month = 12
+        response = client.post(
+            "/pay",
+            json={
+                "membership_fee": "25.00",
+                "bitpin_payment_id": "test-bitpin-reused",
+            },
+            headers=auth_headers(self.user),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("already been used", response.json()["detail"])
+        self.assertFalse(
+            Payment.objects.filter(jalali_year=1402, jalali_month=12).exists()
+        )
+
+    @patch("apps.payments.api.app_settings")
+    @patch("apps.payments.api.get_bitpin_client")
+    def test_pay_duplicate_month_rejected_before_bitpin(
+        self, mock_get_client, mock_settings
+    ):
+        """A second payment for the month is a 409 without calling Bitpin."""
+        self.jalali.year, self.jalali.month = 1402, 9
+        mock_settings.BITPIN_API_KEY = "test-api-key"
+        Payment.objects.create(
+            user=self.user,
+            amount=Decimal("25.00"),
+            jalali_year=1402,
+            jalali_month=9,
+            bitpin_payment_id="test-bitpin-paid",
+        )
+
+        # Even an otherwise invalid payload gets the 409
+        response = client.post(
+            "/pay",
+            json={
+                "membership_fee": "1.00",
+                "bitpin_payment_id": "test-bitpin-second",
+            },
+            headers=auth_headers(self.user),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("already submitted", response.json()["detail"])
+        mock_get_client.assert_not_called()
+
+    @patch("apps.payments.api._payment_conflict", return_value=None)
+    def test_pay_concurrent_duplicate_caught_by_constraint(self, _mock_conflict):
+        """A duplicate that slips past the check is still a 409."""
+        self.jalali.year, self.jalali.month = 1402, 8
+        Payment.objects.create(
+            user=self.user,
+            amount=Decimal("25.00"),
+            jalali_year=1402,
+            jalali_month=8,
+            bitpin_payment_id="test-bitpin-race-a",
+        )
+
+        response = client.post(
+            "/pay",
+            json={
+                "membership_fee": "25.00",
+                "bitpin_payment_id": "test-bitpin-race-b",
+            },
+            headers=auth_headers(self.user),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("already submitted", response.json()["detail"])
+
+    @patch("apps.payments.api.MembershipFeePayment.objects.create")
+    def test_pay_other_integrity_error_propagates(self, mock_create):
+        """Integrity errors other than the duplicate checks are not a 409."""
+        self.jalali.year, self.jalali.month = 1402, 7
+        mock_create.side_effect = IntegrityError("unexpected")
+
+        with self.assertRaises(IntegrityError):
+            client.post(
+                "/pay",
+                json={
+                    "membership_fee": "25.00",
+                    "bitpin_payment_id": "test-bitpin-integrity",
+                },
+                headers=auth_headers(self.user),
+            )
+        self.assertFalse(
+            Payment.objects.filter(jalali_year=1402, jalali_month=7).exists()
+        )
+
+    def test_pay_membership_fee_below_minimum(self):
         """Returns 400 if membership_fee is below minimum."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 4
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 4
 
         response = client.post(
             "/pay",
@@ -301,13 +432,9 @@ class TestPay(TestCase):
         self.assertIn("detail", data)
         self.assertIn("minimum", data["detail"])
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_loan_payment_without_active_loan(self, mock_jalali):
+    def test_pay_loan_payment_without_active_loan(self):
         """Returns 400 if loan payment provided but user has no active loan."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 5
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 5
 
         response = client.post(
             "/pay",
@@ -323,13 +450,9 @@ class TestPay(TestCase):
         self.assertIn("detail", data)
         self.assertIn("active loan", data["detail"])
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_missing_loan_payment_with_active_loan(self, mock_jalali):
+    def test_pay_missing_loan_payment_with_active_loan(self):
         """Returns 400 if user has active loan but no loan payment provided."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 6
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 6
 
         # Create an active loan for the user
         Loan.objects.create(
@@ -355,13 +478,9 @@ class TestPay(TestCase):
         self.assertIn("detail", data)
         self.assertIn("active loan", data["detail"])
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_loan_payment_below_minimum(self, mock_jalali):
+    def test_pay_loan_payment_below_minimum(self):
         """Returns 400 if loan payment is below minimum required."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 7
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 7
 
         # Create an active loan with min_amount_for_each_payment = 20
         Loan.objects.create(
@@ -388,13 +507,9 @@ class TestPay(TestCase):
         self.assertIn("detail", data)
         self.assertIn("minimum", data["detail"])
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_with_active_loan_success(self, mock_jalali):
+    def test_pay_with_active_loan_success(self):
         """Payment with loan repayment succeeds when user has active loan."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 8
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 8
 
         # Create an active loan
         Loan.objects.create(
@@ -422,13 +537,9 @@ class TestPay(TestCase):
         self.assertIsNotNone(data["loan_payment"])
         self.assertEqual(Decimal(data["loan_payment"]["amount"]), Decimal("25.00"))
 
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_updates_loan_request_amount(self, mock_jalali):
+    def test_pay_updates_loan_request_amount(self):
         """Payment with loan_request_amount updates user's loan_request_amount."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 9
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 9
 
         client.post(
             "/pay",
@@ -460,15 +571,36 @@ class TestPay(TestCase):
         )
         self.assertEqual(response.status_code, 422)
 
+    def test_pay_rejects_amount_beyond_column_precision(self):
+        """More than 8 decimal places would not fit the amount columns."""
+        response = client.post(
+            "/pay",
+            json={
+                "membership_fee": "25.000000001",
+                "bitpin_payment_id": "test-bitpin-precision",
+            },
+            headers=auth_headers(self.user),
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Payment.objects.filter(user=self.user).exists())
+
+    def test_pay_rejects_unknown_fields(self):
+        response = client.post(
+            "/pay",
+            json={
+                "membership_fee": "25.00",
+                "bitpin_payment_id": "test-bitpin-extra",
+                "amount": "1000.00",
+            },
+            headers=auth_headers(self.user),
+        )
+        self.assertEqual(response.status_code, 422)
+
     @patch("apps.payments.api.app_settings")
     @patch("apps.payments.api.get_bitpin_client")
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_bitpin_verification_success(self, mock_jalali, mock_get_client, mock_settings):
+    def test_pay_bitpin_verification_success(self, mock_get_client, mock_settings):
         """Payment succeeds when Bitpin verification passes."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 10
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 10
 
         mock_settings.BITPIN_API_KEY = "test-api-key"
 
@@ -491,13 +623,9 @@ class TestPay(TestCase):
 
     @patch("apps.payments.api.app_settings")
     @patch("apps.payments.api.get_bitpin_client")
-    @patch("apps.payments.api.get_current_jalali")
-    def test_pay_bitpin_verification_failure(self, mock_jalali, mock_get_client, mock_settings):
+    def test_pay_bitpin_verification_failure(self, mock_get_client, mock_settings):
         """Payment fails when Bitpin verification fails."""
-        mock_jalali_obj = MagicMock()
-        mock_jalali_obj.year = 1403
-        mock_jalali_obj.month = 11
-        mock_jalali.return_value = mock_jalali_obj
+        self.jalali.year, self.jalali.month = 1403, 11
 
         mock_settings.BITPIN_API_KEY = "test-api-key"
 
@@ -56,6 +56,24 @@ def make_payment(
     )
 
 
+def make_payments(
+    specs: list[tuple[User, Decimal, int, int]],
+) -> list[Payment]:
+    """Create one Payment per (user, amount, year, month) in a single INSERT."""
+    return Payment.objects.bulk_create(
+        [
+            Payment(
+                user=user,
+                amount=amount,
+                jalali_year=jalali_year,
+                jalali_month=jalali_month,
+                bitpin_payment_id=f"bp_{user.username}_{jalali_year}_{jalali_month}",
+            )
+            for user, amount, jalali_year, jalali_month in specs
+        ]
+    )
+
+
 # ---------------------------------------------------------------------------
 # Config tests
 # ---------------------------------------------------------------------------
@@ -96,6 +114,22 @@ class TestConfigModel(TestCase):
 
         assert Config.objects.count() == 1
 
+    def test_get_config_reloads_after_save(self):
+        """Saving the Config invalidates the cached instance."""
+        config = Config.get_config()
+        with self.captureOnCommitCallbacks(execute=True):
+            Config.objects.get(pk=config.pk).save()
+
+        assert Config.get_config() is not config
+
+    def test_refresh_picks_up_queryset_update(self):
+        """refresh() reloads values changed without the save signal."""
+        Config.get_config()
+        Config.objects.filter(pk=1).update(min_membership_fee=Decimal("35"))
+
+        assert Config.get_config().min_membership_fee == Decimal("20")
+        assert Config.refresh().min_membership_fee == Decimal("35")
+
     def test_config_str_representation(self):
         """Config __str__ includes the min_membership_fee."""
         config = Config.get_config()
@@ -118,6 +152,33 @@ class TestConfigModel(TestCase):
         assert config.min_membership_fee == Decimal("30.00000000")
         assert config.max_month_for_loan_payment == 36
 
+    def test_get_config_is_cached(self):
+        """Repeated get_config() calls reuse the cached instance."""
+        Config.get_config()
+
+        with self.assertNumQueries(0):
+            Config.get_config()
+
+    def test_get_config_cache_cleared_on_save(self):
+        """Saving the Config invalidates the cached instance."""
+        Config.get_config()
+        with self.captureOnCommitCallbacks(execute=True):
+            Config.objects.filter(pk=1).first().save()
+
+        with self.assertNumQueries(1):
+            Config.get_config()
+
+    def test_get_config_cache_kept_until_commit(self):
+        """The cached Config is only cleared once the saving transaction commits."""
+        config = Config.get_config()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Config.objects.get(pk=config.pk).save()
+
+            with self.assertNumQueries(0):
+                Config.get_config()
+
+        assert callbacks == [Config.clear_cache]
+
 
 # ---------------------------------------------------------------------------
 # Payment tests
@@ -127,8 +188,9 @@ class TestConfigModel(TestCase):
 class TestPaymentModel(TestCase):
     """Tests for the Payment model."""
 
-    def setUp(self):
-        self.user = make_user("payer")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("payer")
 
     def test_create_payment(self):
         """Payment can be created with required fields."""
@@ -174,12 +236,31 @@ class TestPaymentModel(TestCase):
                 bitpin_id="bp_second",
             )
 
+    def test_payment_bitpin_payment_id_unique(self):
+        """A Bitpin payment ID cannot be recorded on two payments."""
+        make_payment(
+            self.user, Decimal("20.00000000"), 1403, 8, bitpin_id="bp_reused"
+        )
+
+        with self.assertRaises(IntegrityError):
+            make_payment(
+                self.user,
+                Decimal("20.00000000"),
+                1403,
+                9,
+                bitpin_id="bp_reused",
+            )
+
     def test_different_users_can_pay_same_month(self):
         """Two different users can both have payments for the same month."""
         user2 = make_user("payer2")
 
-        payment1 = make_payment(self.user, Decimal("20.00000000"), 1403, 5)
-        payment2 = make_payment(user2, Decimal("20.00000000"), 1403, 5)
+        payment1, payment2 = make_payments(
+            [
+                (self.user, Decimal("20.00000000"), 1403, 5),
+                (user2, Decimal("20.00000000"), 1403, 5),
+            ]
+        )
 
         assert payment1.pk != payment2.pk
         assert (
@@ -189,8 +270,12 @@ class TestPaymentModel(TestCase):
 
     def test_same_user_can_pay_different_months(self):
         """Same user can have payments for different months."""
-        payment1 = make_payment(self.user, Decimal("20.00000000"), 1403, 6)
-        payment2 = make_payment(self.user, Decimal("20.00000000"), 1403, 7)
+        payment1, payment2 = make_payments(
+            [
+                (self.user, Decimal("20.00000000"), 1403, 6),
+                (self.user, Decimal("20.00000000"), 1403, 7),
+            ]
+        )
 
         assert payment1.pk != payment2.pk
 
@@ -210,9 +295,10 @@ class TestPaymentModel(TestCase):
 class TestMembershipFeePaymentModel(TestCase):
     """Tests for the MembershipFeePayment model."""
 
-    def setUp(self):
-        self.user = make_user("member")
-        self.payment = make_payment(self.user, Decimal("30.00000000"), 1403, 1)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("member")
+        cls.payment = make_payment(cls.user, Decimal("30.00000000"), 1403, 1)
 
     def test_create_membership_fee_payment(self):
         """MembershipFeePayment can be created linked to a Payment."""
@@ -261,6 +347,12 @@ class TestMembershipFeePaymentModel(TestCase):
 
         assert self.payment.membership_fee == mfp
 
+        with self.assertNumQueries(1):
+            payment = Payment.objects.select_related("membership_fee").get(
+                pk=self.payment.pk
+            )
+            assert payment.membership_fee == mfp
+
     def test_membership_fee_payment_cascades_on_payment_delete(self):
         """Deleting a Payment also deletes its MembershipFeePayment."""
         MembershipFeePayment.objects.create(
@@ -294,17 +386,18 @@ class TestMembershipFeePaymentModel(TestCase):
 class TestLoanPaymentModel(TestCase):
     """Tests for the LoanPayment model."""
 
-    def setUp(self):
-        self.user = make_user("loaner")
-        self.loan = Loan.objects.create(
-            user=self.user,
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("loaner")
+        cls.loan = Loan.objects.create(
+            user=cls.user,
             amount=Decimal("200.00000000"),
             state=LoanState.ACTIVE,
             jalali_year=1403,
             jalali_month=1,
             min_amount_for_each_payment=Decimal("20.00000000"),
         )
-        self.payment = make_payment(self.user, Decimal("20.00000000"), 1403, 2)
+        cls.payment = make_payment(cls.user, Decimal("20.00000000"), 1403, 2)
 
     def test_create_loan_payment(self):
         """LoanPayment can be created linked to a Payment and Loan."""
@@ -370,6 +463,11 @@ class TestLoanPaymentModel(TestCase):
         assert self.loan.payments.count() == 1
         assert self.loan.payments.first() == lp
 
+        with self.assertNumQueries(1):
+            fetched = list(self.loan.payments.select_related("payment"))
+            assert [p.payment for p in fetched] == [self.payment]
+        assert fetched == [lp]
+
     def test_loan_payment_cascades_on_payment_delete(self):
         """Deleting a Payment also deletes its LoanPayment."""
         LoanPayment.objects.create(
@@ -385,17 +483,22 @@ class TestLoanPaymentModel(TestCase):
 
     def test_multiple_loan_payments_for_same_loan(self):
         """A loan can have multiple LoanPayments (from different Payment records)."""
-        lp1 = LoanPayment.objects.create(
-            payment=self.payment,
-            loan=self.loan,
-            amount=Decimal("20.00000000"),
+        (payment2,) = make_payments(
+            [(self.user, Decimal("30.00000000"), 1403, 3)]
         )
-
-        payment2 = make_payment(self.user, Decimal("30.00000000"), 1403, 3)
-        lp2 = LoanPayment.objects.create(
-            payment=payment2,
-            loan=self.loan,
-            amount=Decimal("30.00000000"),
+        lp1, lp2 = LoanPayment.objects.bulk_create(
+            [
+                LoanPayment(
+                    payment=self.payment,
+                    loan=self.loan,
+                    amount=Decimal("20.00000000"),
+                ),
+                LoanPayment(
+                    payment=payment2,
+                    loan=self.loan,
+                    amount=Decimal("30.00000000"),
+                ),
+            ]
         )
 
         assert self.loan.payments.count() == 2
@@ -420,5 +523,7 @@ class TestLoanPaymentModel(TestCase):
             amount=Decimal("20.00000000"),
         )
 
-        assert self.loan.total_paid == Decimal("20.00000000")
-        assert self.loan.remaining_balance == Decimal("180.00000000")
+        # One SUM query; remaining_balance reuses the cached total_paid.
+        with self.assertNumQueries(1):
+            assert self.loan.total_paid == Decimal("20.00000000")
+            assert self.loan.remaining_balance == Decimal("180.00000000")
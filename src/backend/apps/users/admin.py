@@ -3,6 +3,18 @@ from django.contrib.auth.admin import UserAdmin
 
 from .models import User
 
+# Shown on both the change and the add form.
+FUND_FIELDSET = (
+    "Fund Info",
+    {
+        "fields": (
+            "balance",
+            "is_main",
+            "loan_request_amount",
+        )
+    },
+)
+
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -36,27 +48,5 @@ class CustomUserAdmin(UserAdmin):
         "last_login",
     )
     ordering = ("username",)
-    fieldsets = UserAdmin.fieldsets + (
-        (
-            "Fund Info",
-            {
-                "fields": (
-                    "balance",
-                    "is_main",
-                    "loan_request_amount",
-                )
-            },
-        ),
-    )
-    add_fieldsets = UserAdmin.add_fieldsets + (
-        (
-            "Fund Info",
-            {
-                "fields": (
-                    "balance",
-                    "is_main",
-                    "loan_request_amount",
-                )
-            },
-        ),
-    )
+    fieldsets = UserAdmin.fieldsets + (FUND_FIELDSET,)
+    add_fieldsets = UserAdmin.add_fieldsets + (FUND_FIELDSET,)
@@ -1,10 +1,12 @@
 from typing import Any
 
 from django.contrib.auth import authenticate
+from django.db.models import Exists, OuterRef, QuerySet
 from django.http import HttpRequest
 from ninja import Router
 
-from apps.common.auth import create_access_token, jwt_auth, main_user_auth
+from apps.common.auth import JWTAuth, create_access_token, main_user_auth
+from apps.loans.models import Loan, LoanState
 from apps.users.models import User
 from apps.users.schemas import (
     CreateUserRequest,
@@ -18,6 +20,28 @@ from apps.users.schemas import (
 router = Router(tags=["auth"])
 
 
+def _has_active_loan() -> Exists:
+    """EXISTS subquery for an outer User row having an ACTIVE loan."""
+    return Exists(
+        Loan.objects.filter(user=OuterRef("pk"), state=LoanState.ACTIVE)
+    )
+
+
+class ProfileAuth(JWTAuth):
+    """
+    jwt_auth that also loads has_active_loan_db in the same query.
+
+    User.has_active_loan reads the annotation, so the profile endpoints need
+    no separate EXISTS query.
+    """
+
+    def get_queryset(self) -> QuerySet:
+        return super().get_queryset().annotate(has_active_loan_db=_has_active_loan())
+
+
+profile_auth = ProfileAuth()
+
+
 @router.post(
     "/login", response={200: LoginResponse, 401: ErrorResponse}, auth=None
 )
@@ -80,7 +104,7 @@ def create_user(
 @router.get(
     "/me",
     response={200: UserResponse, 401: ErrorResponse},
-    auth=jwt_auth,
+    auth=profile_auth,
 )
 def get_me(request: HttpRequest) -> tuple[int, Any]:
     """Get the currently authenticated user's profile."""
@@ -101,7 +125,7 @@ def get_me(request: HttpRequest) -> tuple[int, Any]:
 @router.patch(
     "/me/loan-request",
     response={200: UserResponse, 400: ErrorResponse, 401: ErrorResponse},
-    auth=jwt_auth,
+    auth=profile_auth,
 )
 def update_loan_request_amount(
     request: HttpRequest, payload: UpdateLoanRequestAmountRequest
@@ -132,20 +156,25 @@ def update_loan_request_amount(
     auth=main_user_auth,
 )
 def list_users(request: HttpRequest) -> tuple[int, Any]:
-    """List all fund members. Only accessible by is_main users."""
-    users = User.objects.all().order_by("username")
-    result = [
-        UserResponse(
-            id=u.id,
-            username=u.username,
-            first_name=u.first_name,
-            last_name=u.last_name,
-            email=u.email,
-            is_main=u.is_main,
-            balance=u.balance,
-            loan_request_amount=u.loan_request_amount,
-            has_active_loan=u.has_active_loan,
+    """
+    List all fund members. Only accessible by is_main users.
+
+    Rows are read with values() and turned into UserResponse with
+    model_construct(), skipping per-row model instances and field validation:
+    every value comes straight from the database with the declared type.
+    """
+    rows = (
+        User.objects.order_by("username")
+        .values(
+            "id",
+            "username",
+            "first_name",
+            "last_name",
+            "email",
+            "is_main",
+            "balance",
+            "loan_request_amount",
+            has_active_loan=_has_active_loan(),
         )
-        for u in users
-    ]
-    return 200, result
+    )
+    return 200, [UserResponse.model_construct(**row) for row in rows]
@@ -35,11 +35,14 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args: Any, **options: Any) -> None:
-        config, created = Config.objects.get_or_create(pk=1)
-        config.min_membership_fee = options["min_fee"]
-        config.max_month_for_loan_payment = options["max_months"]
-        config.min_amount_for_loan_payment = options["min_payment"]
-        config.save()
+        config, created = Config.objects.update_or_create(
+            pk=1,
+            defaults={
+                "min_membership_fee": options["min_fee"],
+                "max_month_for_loan_payment": options["max_months"],
+                "min_amount_for_loan_payment": options["min_payment"],
+            },
+        )
 
         action = "Created" if created else "Updated"
         self.stdout.write(
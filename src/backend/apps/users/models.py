@@ -31,7 +31,21 @@ class User(AbstractUser):
 
     @property
     def has_active_loan(self) -> bool:
-        """Check if user currently has an active (unpaid) loan."""
+        """
+        Check if user currently has an active (unpaid) loan.
+
+        Uses a has_active_loan_db annotation when the user was loaded with one,
+        then prefetched loans, and otherwise runs its own EXISTS query.
+        """
+        annotated: bool | None = getattr(self, "has_active_loan_db", None)
+        if annotated is not None:
+            return annotated
+
         from apps.loans.models import LoanState
 
+        prefetched = getattr(self, "_prefetched_objects_cache", {})
+        if "loans" in prefetched:
+            return any(
+                loan.state == LoanState.ACTIVE for loan in prefetched["loans"]
+            )
         return self.loans.filter(state=LoanState.ACTIVE).exists()
@@ -3,11 +3,17 @@ from decimal import Decimal
 
 from pydantic import BaseModel, Field, field_validator
 
+# Letters, digits, underscores, dots and hyphens. \Z (not $) so a trailing
+# newline is rejected too.
+USERNAME_RE = re.compile(r"[\w.-]+\Z")
+
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
+    model_config = {"extra": "forbid"}
+
 
 class LoginResponse(BaseModel):
     access_token: str
@@ -26,11 +32,12 @@ class CreateUserRequest(BaseModel):
     is_main: bool = Field(default=False)
     loan_request_amount: Decimal = Field(default=Decimal("0"), ge=0)
 
+    model_config = {"extra": "forbid"}
+
     @field_validator("username")
     @classmethod
     def username_alphanumeric(cls, v: str) -> str:
-        # Allow letters, digits, underscores, hyphens, dots
-        if not re.match(r"^[\w.-]+$", v):
+        if USERNAME_RE.match(v) is None:
             raise ValueError(
                 "Username may only contain letters, digits, underscores, dots, and hyphens"
             )
@@ -52,7 +59,11 @@ class UserResponse(BaseModel):
 
 
 class UpdateLoanRequestAmountRequest(BaseModel):
-    loan_request_amount: Decimal = Field(..., ge=0)
+    loan_request_amount: Decimal = Field(
+        ..., ge=0, max_digits=20, decimal_places=8
+    )
+
+    model_config = {"extra": "forbid"}
 
 
 class ErrorResponse(BaseModel):
@@ -10,36 +10,44 @@ Tests cover:
 """
 
 from decimal import Decimal
+from functools import lru_cache
+from django.contrib.auth.hashers import make_password
 from django.test import TestCase
 
 from ninja.testing import TestClient
 
+from apps.loans.models import Loan, LoanState
 from apps.users.api import router
+from apps.users.models import User
 from apps.common.auth import create_access_token
 
 
 client = TestClient(router)
 
 
+@lru_cache(maxsize=None)
+def _token_for(user_id: int) -> str:
+    """Sign one access token per user id for the whole test run."""
+    return create_access_token(user_id)
+
+
 def auth_headers(user) -> dict:
     """Return Authorization headers for the given user."""
-    token = create_access_token(user.id)
-    return {"Authorization": f"Bearer {token}"}
+    return {"Authorization": f"Bearer {_token_for(user.id)}"}
 
 
 class TestLogin(TestCase):
     """Tests for POST /login"""
 
-    def setUp(self):
-        from apps.users.models import User
-
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="loginuser",
             password="securepass123",
             email="login@example.com",
             is_main=False,
         )
-        self.main_user = User.objects.create_user(
+        cls.main_user = User.objects.create_user(
             username="loginadmin",
             password="adminpass123",
             email="loginadmin@example.com",
@@ -97,20 +105,26 @@ class TestLogin(TestCase):
 class TestCreateUser(TestCase):
     """Tests for POST /users"""
 
-    def setUp(self):
-        from apps.users.models import User
-
-        self.main_user = User.objects.create_user(
-            username="createadmin",
-            password="adminpass123",
-            email="createadmin@example.com",
-            is_main=True,
-        )
-        self.regular_user = User.objects.create_user(
-            username="createregular",
-            password="regularpass123",
-            email="createregular@example.com",
-            is_main=False,
+    @classmethod
+    def setUpTestData(cls):
+        # These users only authenticate by token, so one shared hash and a
+        # single INSERT are enough.
+        password = make_password("testpass123")
+        cls.main_user, cls.regular_user = User.objects.bulk_create(
+            [
+                User(
+                    username="createadmin",
+                    password=password,
+                    email="createadmin@example.com",
+                    is_main=True,
+                ),
+                User(
+                    username="createregular",
+                    password=password,
+                    email="createregular@example.com",
+                    is_main=False,
+                ),
+            ]
         )
 
     def test_create_user_as_main_user(self):
@@ -182,6 +196,29 @@ class TestCreateUser(TestCase):
         )
         self.assertEqual(response.status_code, 422)
 
+    def test_create_user_invalid_username_characters(self):
+        for username in ("bad user", "bad/user", "baduser\n"):
+            with self.subTest(username=username):
+                response = client.post(
+                    "/users",
+                    json={"username": username, "password": "validpass123"},
+                    headers=auth_headers(self.main_user),
+                )
+                self.assertEqual(response.status_code, 422)
+
+    def test_create_user_rejects_unknown_fields(self):
+        """A misspelled or unsupported field is an error, not silently dropped."""
+        response = client.post(
+            "/users",
+            json={
+                "username": "extrafielduser",
+                "password": "validpass123",
+                "is_admin": True,
+            },
+            headers=auth_headers(self.main_user),
+        )
+        self.assertEqual(response.status_code, 422)
+
     def test_create_user_short_password(self):
         response = client.post(
             "/users",
@@ -194,20 +231,26 @@ class TestCreateUser(TestCase):
 class TestListUsers(TestCase):
     """Tests for GET /users"""
 
-    def setUp(self):
-        from apps.users.models import User
-
-        self.main_user = User.objects.create_user(
-            username="listadmin",
-            password="adminpass123",
-            email="listadmin@example.com",
-            is_main=True,
-        )
-        self.regular_user = User.objects.create_user(
-            username="listregular",
-            password="regularpass123",
-            email="listregular@example.com",
-            is_main=False,
+    @classmethod
+    def setUpTestData(cls):
+        # These users only authenticate by token, so one shared hash and a
+        # single INSERT are enough.
+        password = make_password("testpass123")
+        cls.main_user, cls.regular_user = User.objects.bulk_create(
+            [
+                User(
+                    username="listadmin",
+                    password=password,
+                    email="listadmin@example.com",
+                    is_main=True,
+                ),
+                User(
+                    username="listregular",
+                    password=password,
+                    email="listregular@example.com",
+                    is_main=False,
+                ),
+            ]
         )
 
     def test_list_users_as_main_user(self):
@@ -223,6 +266,38 @@ class TestListUsers(TestCase):
         self.assertIn("listadmin", usernames)
         self.assertIn("listregular", usernames)
 
+    def test_list_users_has_active_loan_in_one_query(self):
+        """has_active_loan comes from the list query, not a query per user."""
+        borrowers = User.objects.bulk_create(
+            [User(username=f"listborrower{i}") for i in range(5)]
+        )
+        Loan.objects.bulk_create(
+            [
+                Loan(
+                    user=user,
+                    amount=Decimal("100.00"),
+                    state=LoanState.ACTIVE,
+                    jalali_year=1403,
+                    jalali_month=month,
+                )
+                for month, user in enumerate(
+                    [self.regular_user, *borrowers], start=1
+                )
+            ]
+        )
+        headers = auth_headers(self.main_user)
+
+        # One query to authenticate, one to list the users, however many
+        with self.assertNumQueries(2):
+            response = client.get("/users", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        flags = {u["username"]: u["has_active_loan"] for u in response.json()}
+        self.assertEqual(len(flags), 7)
+        self.assertTrue(flags["listregular"])
+        self.assertTrue(flags["listborrower4"])
+        self.assertFalse(flags["listadmin"])
+
     def test_list_users_unauthorized_regular_user(self):
         response = client.get(
             "/users",
@@ -261,10 +336,9 @@ class TestListUsers(TestCase):
 class TestGetMe(TestCase):
     """Tests for GET /me"""
 
-    def setUp(self):
-        from apps.users.models import User
-
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="meuser",
             password="mepass123",
             email="meuser@example.com",
@@ -289,6 +363,15 @@ class TestGetMe(TestCase):
         self.assertFalse(data["is_main"])
         self.assertFalse(data["has_active_loan"])
 
+    def test_get_me_single_query(self):
+        """/me is served entirely by the authentication query."""
+        headers = auth_headers(self.user)
+
+        with self.assertNumQueries(1):
+            response = client.get("/me", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+
     def test_get_me_no_auth(self):
         response = client.get("/me")
         self.assertEqual(response.status_code, 401)
@@ -325,10 +408,9 @@ class TestGetMe(TestCase):
 class TestUpdateLoanRequestAmount(TestCase):
     """Tests for PATCH /me/loan-request"""
 
-    def setUp(self):
-        from apps.users.models import User
-
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="loanrequser",
             password="loanreqpass123",
             email="loanreq@example.com",
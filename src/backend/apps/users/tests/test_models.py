@@ -10,8 +10,10 @@ Tests cover:
 """
 
 from decimal import Decimal
+from django.db.models import Exists, OuterRef
 from django.test import TestCase
 
+from apps.loans.models import Loan, LoanState
 from apps.users.models import User
 
 
@@ -93,8 +95,9 @@ class TestUserCreation(TestCase):
 class TestUserHasActiveLoan(TestCase):
     """Tests for the has_active_loan property."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="loanuser",
             password="pass123",
             balance=Decimal("200.00000000"),
@@ -107,8 +110,6 @@ class TestUserHasActiveLoan(TestCase):
 
     def test_has_active_loan_true_when_active_loan_exists(self):
         """has_active_loan is True when user has an ACTIVE loan."""
-        from apps.loans.models import Loan, LoanState
-
         Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
@@ -121,8 +122,6 @@ class TestUserHasActiveLoan(TestCase):
 
     def test_has_active_loan_false_when_only_initial_loan(self):
         """has_active_loan is False when user only has an INITIAL loan."""
-        from apps.loans.models import Loan, LoanState
-
         Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
@@ -135,8 +134,6 @@ class TestUserHasActiveLoan(TestCase):
 
     def test_has_active_loan_false_when_only_no_one_loan(self):
         """has_active_loan is False when only NO_ONE loan exists (no user assigned)."""
-        from apps.loans.models import Loan, LoanState
-
         # NO_ONE loans have no user assigned
         Loan.objects.create(
             user=None,
@@ -149,8 +146,6 @@ class TestUserHasActiveLoan(TestCase):
 
     def test_has_active_loan_false_after_loan_settled(self):
         """has_active_loan is False when user's loan is not in ACTIVE state."""
-        from apps.loans.models import Loan, LoanState
-
         loan = Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
@@ -166,26 +161,64 @@ class TestUserHasActiveLoan(TestCase):
 
     def test_has_active_loan_true_with_multiple_loans(self):
         """has_active_loan is True even if user has multiple loans, one being active."""
-        from apps.loans.models import Loan, LoanState
+        Loan.objects.bulk_create(
+            [
+                # An old initial loan
+                Loan(
+                    user=self.user,
+                    amount=Decimal("50.00000000"),
+                    state=LoanState.INITIAL,
+                    jalali_year=1402,
+                    jalali_month=1,
+                ),
+                # A current active loan
+                Loan(
+                    user=self.user,
+                    amount=Decimal("100.00000000"),
+                    state=LoanState.ACTIVE,
+                    jalali_year=1403,
+                    jalali_month=5,
+                ),
+            ]
+        )
 
-        # An old initial loan
+        assert self.user.has_active_loan is True
+
+    def test_has_active_loan_uses_prefetched_loans(self):
+        """Prefetched loans are checked in Python instead of re-querying."""
         Loan.objects.create(
             user=self.user,
-            amount=Decimal("50.00000000"),
-            state=LoanState.INITIAL,
-            jalali_year=1402,
-            jalali_month=1,
+            amount=Decimal("100.00000000"),
+            state=LoanState.ACTIVE,
+            jalali_year=1403,
+            jalali_month=6,
         )
-        # A current active loan
+        user = User.objects.prefetch_related("loans").get(pk=self.user.pk)
+
+        with self.assertNumQueries(0):
+            assert user.has_active_loan is True
+
+    def test_has_active_loan_reads_annotation_without_queries(self):
+        """Users annotated with has_active_loan_db are listed in one query."""
         Loan.objects.create(
             user=self.user,
             amount=Decimal("100.00000000"),
             state=LoanState.ACTIVE,
             jalali_year=1403,
-            jalali_month=5,
+            jalali_month=6,
         )
+        User.objects.create_user(username="noloanuser", password="pass123")
 
-        assert self.user.has_active_loan is True
+        active_loan = Exists(
+            Loan.objects.filter(user=OuterRef("pk"), state=LoanState.ACTIVE)
+        )
+        with self.assertNumQueries(1):
+            flags = {
+                u.username: u.has_active_loan
+                for u in User.objects.annotate(has_active_loan_db=active_loan)
+            }
+
+        assert flags == {"loanuser": True, "noloanuser": False}
 
 
 class TestUserBalanceField(TestCase):
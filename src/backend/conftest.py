@@ -8,6 +8,50 @@ import pytest
 from decimal import Decimal
 
 
+@pytest.fixture(autouse=True, scope="session")
+def _local_memory_cache():
+    """
+    Use a per-process in-memory cache instead of Redis.
+
+    Each xdist worker has its own test database, so cached rows (such as
+    Config) must not be shared between workers through Redis.
+    """
+    from django.test import override_settings
+
+    with override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            }
+        }
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_config_cache(_local_memory_cache):
+    """Drop the cached Config so each test sees its own database state."""
+    from apps.payments.models import Config
+
+    Config.clear_cache()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _fast_password_hasher():
+    """
+    Hash test passwords with MD5 instead of the deliberately slow PBKDF2.
+
+    Session-scoped so it is already active when TestCase.setUpTestData creates
+    users, which happens before any function-scoped fixture runs.
+    """
+    from django.test import override_settings
+
+    with override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+    ):
+        yield
+
+
 @pytest.fixture
 def regular_user(db):
     """Create a regular (non-admin) test user."""
@@ -23,6 +23,10 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: PostgresDsn
+    # Seconds to keep a DB connection open between requests (0 = per request)
+    CONN_MAX_AGE: int = 60
+    # Log every SQL query in dev (saghat.settings.dev only)
+    SQL_DEBUG: bool = False
 
     # Redis
     REDIS_URL: RedisDsn = "redis://localhost:6379/0"  # type: ignore[assignment]
@@ -99,6 +103,7 @@ WSGI_APPLICATION = "saghat.wsgi.application"
 ASGI_APPLICATION = "saghat.asgi.application"
 
 # Database
+_db_host = settings.DATABASE_URL.hosts()[0]
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -107,10 +112,12 @@ DATABASES = {
             if settings.DATABASE_URL.path
             else "saghat"
         ),
-        "USER": settings.DATABASE_URL.hosts()[0]["username"] or "saghat",
-        "PASSWORD": settings.DATABASE_URL.hosts()[0]["password"] or "saghat",
-        "HOST": settings.DATABASE_URL.hosts()[0]["host"] or "localhost",
-        "PORT": str(settings.DATABASE_URL.hosts()[0]["port"] or 5432),
+        "USER": _db_host["username"] or "saghat",
+        "PASSWORD": _db_host["password"] or "saghat",
+        "HOST": _db_host["host"] or "localhost",
+        "PORT": str(_db_host["port"] or 5432),
+        "CONN_MAX_AGE": settings.CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -153,3 +160,53 @@ STATIC_URL = "static/"
 
 # Primary key type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# ── Logging ───────────────────────────────────────────────────────────────────
+
+
+def build_logging(
+    *,
+    django: str,
+    request: str,
+    db: str,
+    apps: str,
+    root: str,
+) -> dict:
+    """
+    Return a LOGGING dict that sends everything to stdout.
+
+    dev.py and prod.py only differ in the level of each logger, so they pass
+    those in and share the handler/formatter layout.
+    """
+
+    def logger(level: str) -> dict:
+        return {"handlers": ["console"], "level": level, "propagate": False}
+
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "verbose": {
+                "format": "[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+                "datefmt": "%Y-%m-%d %H:%M:%S",
+            },
+        },
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "formatter": "verbose",
+                "stream": "ext://sys.stdout",
+            },
+        },
+        "loggers": {
+            "django": logger(django),
+            # 4xx/5xx request errors
+            "django.request": logger(request),
+            # SQL queries
+            "django.db.backends": logger(db),
+            # All app loggers under the `apps.*` namespace
+            "apps": logger(apps),
+        },
+        # Catch-all root logger
+        "root": {"handlers": ["console"], "level": root},
+    }
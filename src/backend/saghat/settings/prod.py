@@ -1,3 +1,5 @@
+import logging
+
 from saghat.settings.base import *  # noqa: F401, F403
 
 # ── Prod overrides ────────────────────────────────────────────────────────────
@@ -7,51 +9,20 @@ DEBUG = False
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 
-LOGGING = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "[%(asctime)s] %(levelname)s %(name)s: %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "verbose",
-            "stream": "ext://sys.stdout",
-        },
-    },
-    "loggers": {
-        # Root Django logger — WARNING to reduce noise in production
-        "django": {
-            "handlers": ["console"],
-            "level": "WARNING",
-            "propagate": False,
-        },
-        # Log 4xx/5xx request errors at ERROR level in prod
-        "django.request": {
-            "handlers": ["console"],
-            "level": "ERROR",
-            "propagate": False,
-        },
-        # Suppress SQL query logging in production
-        "django.db.backends": {
-            "handlers": ["console"],
-            "level": "ERROR",
-            "propagate": False,
-        },
-        # App loggers — WARNING in prod; use explicit logger.error() for critical paths
-        "apps": {
-            "handlers": ["console"],
-            "level": "WARNING",
-            "propagate": False,
-        },
-    },
-    # Catch-all root logger — WARNING in prod
-    "root": {
-        "handlers": ["console"],
-        "level": "WARNING",
-    },
-}
+# WARNING and up only; SQL logging is suppressed. Use explicit
+# logger.error() on critical app paths.
+LOGGING = build_logging(  # noqa: F405
+    django="WARNING",
+    request="ERROR",
+    db="ERROR",
+    apps="WARNING",
+    root="WARNING",
+)
+
+# The log format only uses time, level, logger name and message, so skip
+# collecting thread/process info on every LogRecord, and never print
+# tracebacks from inside the logging machinery itself.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging.raiseExceptions = False
@@ -3,6 +3,7 @@ from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
 from ninja import NinjaAPI
+from apps.common.renderers import ORJSONRenderer
 from apps.users.api import router as users_router
 from apps.payments.api import router as payments_router
 from apps.loans.api import router as loans_router
@@ -12,6 +13,7 @@ api = NinjaAPI(
     version="1.0.0",
     docs_url="/docs",
     openapi_url="/openapi.json",
+    renderer=ORJSONRenderer(),
 )
 api.add_router("/auth", users_router)
 api.add_router("/payments", payments_router)